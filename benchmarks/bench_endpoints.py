@@ -0,0 +1,212 @@
+# Vazão e latência de cauda de cada endpoint, com clientes concorrentes.
+#
+# Popula o banco com UserFactory/TodoFactory (os mesmos dos testes), dispara
+# --concurrency clientes contra cada cenário por --seconds e grava o
+# resultado em JSON, para comparar dois commits no mesmo Postgres. Uso:
+#
+#   BENCH_DATABASE_URL=postgresql+psycopg://... \
+#       python -m benchmarks.bench_endpoints --output antes.json
+#   BENCH_DATABASE_URL=postgresql+psycopg://... \
+#       python -m benchmarks.bench_endpoints --output depois.json \
+#       --compare antes.json
+import argparse
+import asyncio
+import json
+import subprocess
+import time
+from datetime import datetime
+from itertools import count
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_zero.models import User
+from fastapi_zero.security import create_user_token, get_password_hash
+from tests.conftest import TodoFactory, UserFactory
+
+from .utils import bench_client, percentile
+
+PASSWORD = 'secret'
+
+
+class Worker:
+    # cada cliente usa o próprio usuário, para não disputar as mesmas linhas
+    def __init__(self, user: User, todo_ids: list[int]):
+        self.user = user
+        self.headers = {'Authorization': f'Bearer {create_user_token(user)}'}
+        self.todo_ids = todo_ids
+        self.sequence = count()
+
+    def next_todo(self) -> int:
+        return self.todo_ids[next(self.sequence) % len(self.todo_ids)]
+
+
+async def seed(engine, users: int, todos_per_user: int) -> list[Worker]:
+    password = get_password_hash(PASSWORD)
+    async with AsyncSession(engine, expire_on_commit=False) as session:
+        db_users = UserFactory.build_batch(users, password=password)
+        session.add_all(db_users)
+        await session.flush()
+        db_todos = [
+            TodoFactory.build(user_id=user.id)
+            for user in db_users
+            for _ in range(todos_per_user)
+        ]
+        session.add_all(db_todos)
+        await session.commit()
+
+    todo_ids = {}
+    for todo in db_todos:
+        todo_ids.setdefault(todo.user_id, []).append(todo.id)
+    return [Worker(user, todo_ids[user.id]) for user in db_users]
+
+
+async def login(client, worker: Worker):
+    return await client.post(
+        '/auth/token',
+        data={'username': worker.user.email, 'password': PASSWORD},
+    )
+
+
+async def list_users(client, worker: Worker):
+    return await client.get('/users/', headers=worker.headers)
+
+
+async def read_user(client, worker: Worker):
+    return await client.get(f'/users/{worker.user.id}')
+
+
+async def list_todos(client, worker: Worker):
+    return await client.get('/todos/', headers=worker.headers)
+
+
+async def create_todo(client, worker: Worker):
+    return await client.post(
+        '/todos/',
+        headers=worker.headers,
+        json={'title': 'bench', 'description': 'bench', 'state': 'todo'},
+    )
+
+
+async def patch_todo(client, worker: Worker):
+    return await client.patch(
+        f'/todos/{worker.next_todo()}',
+        headers=worker.headers,
+        json={'state': 'doing'},
+    )
+
+
+async def delete_todo(client, worker: Worker):
+    # apaga o que a própria iteração criou, para não esvaziar o seed
+    response = await create_todo(client, worker)
+    return await client.delete(
+        f'/todos/{response.json()["id"]}', headers=worker.headers
+    )
+
+
+SCENARIOS = {
+    'POST /auth/token': login,
+    'GET /users/': list_users,
+    'GET /users/{user_id}': read_user,
+    'GET /todos/': list_todos,
+    'POST /todos/': create_todo,
+    'PATCH /todos/{todo_id}': patch_todo,
+    'POST+DELETE /todos/{todo_id}': delete_todo,
+}
+
+
+async def drive(client, scenario, worker: Worker, deadline: float, result):
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        response = await scenario(client, worker)
+        result['samples'].append(time.perf_counter() - start)
+        if response.status_code >= 400:  # noqa: PLR2004
+            result['errors'] += 1
+
+
+async def run_scenario(client, scenario, workers, seconds: float) -> dict:
+    result = {'samples': [], 'errors': 0}
+    start = time.perf_counter()
+    deadline = start + seconds
+    await asyncio.gather(
+        *(
+            drive(client, scenario, worker, deadline, result)
+            for worker in workers
+        )
+    )
+    elapsed = time.perf_counter() - start
+    samples = result['samples']
+    return {
+        'requests': len(samples),
+        'errors': result['errors'],
+        'rps': len(samples) / elapsed,
+        'p50': percentile(samples, 50) * 1000,
+        'p95': percentile(samples, 95) * 1000,
+        'p99': percentile(samples, 99) * 1000,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(
+            ['git', 'rev-parse', '--short', 'HEAD'], text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def format_row(name: str, result: dict, baseline: dict | None) -> str:
+    row = (
+        f'{name:<30} rps={result["rps"]:9.1f} '
+        f'p50={result["p50"]:8.2f}ms '
+        f'p95={result["p95"]:8.2f}ms '
+        f'p99={result["p99"]:8.2f}ms '
+        f'erros={result["errors"]}'
+    )
+    if baseline:
+        rps = (result['rps'] / baseline['rps'] - 1) * 100
+        p99 = (result['p99'] / baseline['p99'] - 1) * 100
+        row += f'  (rps {rps:+.1f}%, p99 {p99:+.1f}%)'
+    return row
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--users', type=int, default=20)
+    parser.add_argument('--todos-per-user', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--scenario', action='append', choices=SCENARIOS)
+    parser.add_argument('--output')
+    parser.add_argument('--compare')
+    args = parser.parse_args()
+
+    baseline = {}
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as file:
+            baseline = json.load(file)['results']
+
+    results = {}
+    async with bench_client(pool_size=args.concurrency) as (client, engine):
+        workers = await seed(
+            engine, max(args.users, args.concurrency), args.todos_per_user
+        )
+        workers = workers[: args.concurrency]
+        for name in args.scenario or SCENARIOS:
+            results[name] = await run_scenario(
+                client, SCENARIOS[name], workers, args.seconds
+            )
+            print(format_row(name, results[name], baseline.get(name)))
+
+    if args.output:
+        report = {
+            'commit': git_commit(),
+            'date': datetime.now().isoformat(timespec='seconds'),
+            'params': vars(args),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
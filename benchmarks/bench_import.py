@@ -0,0 +1,73 @@
+# Vazão (linhas/s) do POST /todos/import comparada a um POST /todos/ por
+# linha. Uso:
+#
+#   BENCH_DATABASE_URL=postgresql+psycopg://... \
+#       python -m benchmarks.bench_import --rows 100000 --single-rows 1000
+import argparse
+import asyncio
+import json
+import time
+
+from .utils import bench_client, create_user_and_token
+
+
+def make_rows(count: int) -> list[dict]:
+    return [
+        {
+            'title': f'todo {i}',
+            'description': f'descrição {i}',
+            'state': 'todo',
+        }
+        for i in range(count)
+    ]
+
+
+async def row_at_a_time(client, headers, rows, concurrency: int) -> float:
+    queue = list(rows)
+
+    async def worker():
+        while queue:
+            await client.post('/todos/', json=queue.pop(), headers=headers)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return len(rows) / (time.perf_counter() - start)
+
+
+async def bulk_import(client, headers, rows) -> float:
+    body = '\n'.join(json.dumps(row) for row in rows).encode()
+    start = time.perf_counter()
+    response = await client.post(
+        '/todos/import',
+        content=body,
+        headers={**headers, 'Content-Type': 'application/x-ndjson'},
+    )
+    elapsed = time.perf_counter() - start
+    done = json.loads(response.text.splitlines()[-1])
+    assert done['imported'] == len(rows), done
+    return len(rows) / elapsed
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--single-rows', type=int, default=1000)
+    parser.add_argument('--concurrency', type=int, default=10)
+    args = parser.parse_args()
+
+    async with bench_client() as (client, _):
+        _, token = await create_user_and_token(client)
+        headers = {'Authorization': f'Bearer {token}'}
+
+        single = await row_at_a_time(
+            client, headers, make_rows(args.single_rows), args.concurrency
+        )
+        print(f'POST /todos/ por linha:  {single:12,.0f} linhas/s')
+
+        bulk = await bulk_import(client, headers, make_rows(args.rows))
+        print(f'POST /todos/import:      {bulk:12,.0f} linhas/s')
+        print(f'ganho: {bulk / single:.1f}x')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
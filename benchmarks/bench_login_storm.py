@@ -0,0 +1,76 @@
+# Latência de GET /todos/ enquanto o /auth/token recebe uma rajada de logins.
+#
+# Compara o argon2 rodando no próprio event loop (HASH_POOL_SIZE=0) com o
+# pool configurado em Settings. Uso:
+#
+#   BENCH_DATABASE_URL=postgresql+psycopg://... \
+#       python -m benchmarks.bench_login_storm --logins 8 --seconds 5
+import argparse
+import asyncio
+import time
+
+from fastapi_zero.settings import get_settings
+
+from .utils import (
+    bench_client,
+    create_user_and_token,
+    format_summary,
+    summarize,
+    timed,
+)
+
+
+async def storm(client, user, stop):
+    data = {'username': user['email'], 'password': user['password']}
+    while not stop.is_set():
+        await client.post('/auth/token', data=data)
+
+
+async def probe(client, token, stop) -> list[float]:
+    headers = {'Authorization': f'Bearer {token}'}
+    samples = []
+    while not stop.is_set():
+        samples.append(await timed(client.get('/todos/', headers=headers)))
+    return samples
+
+
+async def run(hash_pool_size: int, logins: int, seconds: float) -> dict:
+    settings = get_settings().model_copy(
+        update={'HASH_POOL_SIZE': hash_pool_size}
+    )
+    async with bench_client(settings=settings) as (client, _):
+        user, token = await create_user_and_token(client)
+        stop = asyncio.Event()
+        tasks = [
+            asyncio.create_task(storm(client, user, stop))
+            for _ in range(logins)
+        ]
+        probe_task = asyncio.create_task(probe(client, token, stop))
+        await asyncio.sleep(seconds)
+        stop.set()
+        await asyncio.gather(*tasks)
+        samples = await probe_task
+    return summarize(samples)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--logins', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    args = parser.parse_args()
+
+    settings = get_settings()
+    scenarios = {
+        'argon2 no event loop': 0,
+        f'argon2 em pool {settings.HASH_POOL_KIND} '
+        f'({settings.HASH_POOL_SIZE})': settings.HASH_POOL_SIZE,
+    }
+    for name, hash_pool_size in scenarios.items():
+        start = time.perf_counter()
+        summary = await run(hash_pool_size, args.logins, args.seconds)
+        print(format_summary(name, summary))
+        print(f'  ({time.perf_counter() - start:.1f}s)')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
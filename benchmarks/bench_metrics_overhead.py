@@ -0,0 +1,77 @@
+# Custo do MetricsMiddleware por requisição.
+#
+# Chama a aplicação ASGI diretamente, sem servidor nem banco, com e sem o
+# middleware, para isolar o que ele acrescenta. Uso:
+#
+#   python -m benchmarks.bench_metrics_overhead --requests 20000
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI
+
+from fastapi_zero.middleware import MetricsMiddleware
+
+
+def build_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get('/todos/{todo_id}')
+    async def read(todo_id: int):
+        return {'id': todo_id}
+
+    return app
+
+
+async def call(app, path: str):
+    scope = {
+        'type': 'http',
+        'asgi': {'version': '3.0'},
+        'http_version': '1.1',
+        'method': 'GET',
+        'scheme': 'http',
+        'path': path,
+        'raw_path': path.encode(),
+        'root_path': '',
+        'query_string': b'',
+        'headers': [],
+        'server': ('bench', 80),
+    }
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        pass
+
+    await app(scope, receive, send)
+
+
+async def run(app, requests: int) -> float:
+    # aquece o roteador antes de medir
+    for i in range(100):
+        await call(app, f'/todos/{i}')
+    start = time.perf_counter()
+    for i in range(requests):
+        await call(app, f'/todos/{i}')
+    return (time.perf_counter() - start) / requests
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--requests', type=int, default=20000)
+    args = parser.parse_args()
+
+    app = build_app()
+    # a pilha de middlewares é montada no primeiro request, então o
+    # middleware é aplicado por fora, sobre a mesma aplicação
+    plain = await run(app, args.requests)
+    measured = await run(MetricsMiddleware(app), args.requests)
+
+    print(f'{"sem middleware":<20} {plain * 1e6:8.1f}us/req')
+    print(f'{"com middleware":<20} {measured * 1e6:8.1f}us/req')
+    print(f'{"overhead":<20} {(measured - plain) * 1e6:8.1f}us/req')
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,91 @@
+# Custo por linha de serializar GET /todos/.
+#
+# Compara o caminho antigo (entidades ORM validadas em TodoList e depois
+# convertidas em JSON, como o FastAPI faz com o response_model) com o atual
+# (linhas de colunas serializadas direto em bytes pelo pydantic-core). Só a
+# serialização é medida; a consulta fica fora do tempo. Uso:
+#
+#   BENCH_DATABASE_URL=postgresql+psycopg://... \
+#       python -m benchmarks.bench_serialization --rows 100 1000 10000
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fastapi_zero.models import Todo, table_registry
+from fastapi_zero.routers.todos import TODO_PUBLIC_COLUMNS
+from fastapi_zero.schemas import TodoList
+from fastapi_zero.serialization import json_response, rows_to_dicts
+
+SEED = """
+INSERT INTO users (username, email, password) VALUES ('b', 'b@b.com', 'x');
+INSERT INTO todos (title, description, state, user_id)
+SELECT 'todo ' || i, md5(i::text), 'todo', 1
+FROM generate_series(1, {rows}) AS i;
+"""
+
+
+def validated(todos) -> bytes:
+    content = TodoList.model_validate(
+        {'todos': todos, 'next_cursor': None}, from_attributes=True
+    )
+    return json.dumps(content.model_dump(mode='json')).encode()
+
+
+def direct(rows) -> bytes:
+    return json_response({
+        'todos': rows_to_dicts(rows),
+        'next_cursor': None,
+    }).body
+
+
+def per_row(func, items, runs: int) -> float:
+    start = time.perf_counter()
+    for _ in range(runs):
+        func(items)
+    return (time.perf_counter() - start) / runs / len(items)
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, nargs='+', default=[100, 1000])
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    engine = create_async_engine(os.environ['BENCH_DATABASE_URL'])
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+        for statement in SEED.format(rows=max(args.rows)).split(';')[:-1]:
+            await conn.execute(text(statement))
+    try:
+        async with AsyncSession(engine) as session:
+            for rows in args.rows:
+                todos = (await session.scalars(select(Todo).limit(rows))).all()
+                columns = (
+                    await session.execute(
+                        select(*TODO_PUBLIC_COLUMNS).limit(rows)
+                    )
+                ).all()
+                assert json.loads(validated(todos)) == json.loads(
+                    direct(columns)
+                )
+                before = per_row(validated, todos, args.runs)
+                after = per_row(direct, columns, args.runs)
+                print(
+                    f'{rows:>7} linhas  '
+                    f'validação={before * 1e6:6.2f}us/linha  '
+                    f'direto={after * 1e6:6.2f}us/linha  '
+                    f'({before / after:.1f}x)'
+                )
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(table_registry.metadata.drop_all)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
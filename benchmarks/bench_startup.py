@@ -0,0 +1,68 @@
+# Tempo de partida: import do pacote, create_app() e primeira requisição.
+#
+# Cada rodada é um processo Python novo, para que nada venha do cache de
+# módulos do processo anterior. A primeira requisição passa pelo lifespan
+# (criação do engine) e por toda a pilha de middlewares. Uso:
+#
+#   python -m benchmarks.bench_startup --runs 10
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+PROBE = """
+import asyncio, json, time
+
+start = time.perf_counter()
+from fastapi_zero.app import create_app
+imported = time.perf_counter()
+app = create_app()
+created = time.perf_counter()
+
+import httpx
+
+async def first_request():
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(
+            transport=transport, base_url='http://bench'
+        ) as client:
+            response = await client.get({path!r})
+            response.raise_for_status()
+            return time.perf_counter()
+
+answered = asyncio.run(first_request())
+print(json.dumps({{
+    'import': imported - start,
+    'create_app': created - imported,
+    'first_request': answered - created,
+    'total': answered - start,
+}}))
+"""
+
+
+def run_once(path: str) -> dict:
+    output = subprocess.check_output(
+        [sys.executable, '-c', PROBE.format(path=path)], text=True
+    )
+    return json.loads(output.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/')
+    args = parser.parse_args()
+
+    runs = [run_once(args.path) for _ in range(args.runs)]
+    for phase in ('import', 'create_app', 'first_request', 'total'):
+        samples = [run[phase] * 1000 for run in runs]
+        print(
+            f'{phase:<15} mediana={statistics.median(samples):8.1f}ms '
+            f'min={min(samples):8.1f}ms max={max(samples):8.1f}ms'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+# Filtro de substring em GET /todos/ com e sem os índices trigram.
+#
+# Popula a tabela todos com --rows linhas (1 milhão por padrão) e mede a
+# consulta de list_todos filtrando por title e por description. Uso:
+#
+#   BENCH_DATABASE_URL=postgresql+psycopg://... \
+#       python -m benchmarks.bench_todo_search --rows 1000000
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+from sqlalchemy import select, text
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from fastapi_zero.models import Todo, table_registry
+from fastapi_zero.pagination import paginate
+from fastapi_zero.routers.todos import filter_todos
+from fastapi_zero.schemas import FilterTodo
+
+TRGM_INDEXES = {
+    'ix_todos_title_trgm': 'title',
+    'ix_todos_description_trgm': 'description',
+}
+
+SEED_USERS = """
+INSERT INTO users (username, email, password)
+SELECT 'bench' || i, 'bench' || i || '@bench.com', 'x'
+FROM generate_series(1, :users) AS i
+"""
+
+# textos pseudo-aleatórios, com a palavra procurada em ~0,1% das linhas
+SEED_TODOS = """
+INSERT INTO todos (title, description, state, user_id)
+SELECT
+    md5(i::text) || CASE WHEN i % 1000 = 0 THEN ' relatorio' ELSE '' END,
+    md5((i * 7)::text) || ' ' || md5((i * 13)::text),
+    'todo',
+    1 + i % :users
+FROM generate_series(1, :rows) AS i
+"""
+
+
+async def measure(conn, todo_filter: FilterTodo, runs: int) -> tuple:
+    query = paginate(
+        filter_todos(select(Todo), 1, todo_filter),
+        Todo.id,
+        None,
+        todo_filter.limit,
+        todo_filter.offset,
+    )
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        await conn.execute(query)
+        timings.append(time.perf_counter() - start)
+
+    compiled = query.compile(
+        dialect=conn.dialect, compile_kwargs={'literal_binds': True}
+    )
+    plan = await conn.scalar(text(f'EXPLAIN (FORMAT JSON) {compiled}'))
+    return statistics.median(timings) * 1000, plan_nodes(plan[0]['Plan'])
+
+
+def plan_nodes(node: dict) -> set[str]:
+    names = {node['Node Type'] + ' ' + node.get('Index Name', '')}
+    for child in node.get('Plans', []):
+        names |= plan_nodes(child)
+    return {name.strip() for name in names}
+
+
+async def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--runs', type=int, default=5)
+    args = parser.parse_args()
+
+    engine = create_async_engine(os.environ['BENCH_DATABASE_URL'])
+    scenarios = {
+        'title': FilterTodo(title='relatorio', limit=100),
+        'description': FilterTodo(description='abc1', limit=100),
+    }
+    try:
+        async with engine.begin() as conn:
+            await conn.run_sync(table_registry.metadata.create_all)
+            params = {'users': args.users, 'rows': args.rows}
+            await conn.execute(text(SEED_USERS), params)
+            await conn.execute(text(SEED_TODOS), params)
+            await conn.execute(text('ANALYZE todos'))
+
+        async with engine.connect() as conn:
+            for name, todo_filter in scenarios.items():
+                with_index, plan = await measure(conn, todo_filter, args.runs)
+                print(f'{name:<12} com trigram: {with_index:9.2f}ms {plan}')
+
+            for index in TRGM_INDEXES:
+                await conn.execute(text(f'DROP INDEX {index}'))
+            await conn.execute(text('ANALYZE todos'))
+            for name, todo_filter in scenarios.items():
+                without, plan = await measure(conn, todo_filter, args.runs)
+                print(f'{name:<12} sem trigram: {without:9.2f}ms {plan}')
+            await conn.rollback()
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(table_registry.metadata.drop_all)
+        await engine.dispose()
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,98 @@
+# Os benchmarks usam um banco próprio, apontado por BENCH_DATABASE_URL,
+# porque as tabelas são criadas e removidas a cada execução.
+import os
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+
+from fastapi_zero.app import create_app
+from fastapi_zero.database import get_session
+from fastapi_zero.models import table_registry
+from fastapi_zero.routers.auth import check_login_throttle
+from fastapi_zero.security import get_user_read_session
+from fastapi_zero.settings import Settings
+
+
+def percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = round(pct / 100 * (len(ordered) - 1))
+    return ordered[index]
+
+
+def summarize(samples: list[float]) -> dict:
+    # latências em milissegundos
+    return {
+        'count': len(samples),
+        'p50': percentile(samples, 50) * 1000,
+        'p95': percentile(samples, 95) * 1000,
+        'p99': percentile(samples, 99) * 1000,
+        'max': max(samples) * 1000,
+    }
+
+
+def format_summary(name: str, summary: dict) -> str:
+    return (
+        f'{name:<40} n={summary["count"]:<6} '
+        f'p50={summary["p50"]:8.2f}ms '
+        f'p95={summary["p95"]:8.2f}ms '
+        f'p99={summary["p99"]:8.2f}ms'
+    )
+
+
+async def timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+@asynccontextmanager
+async def bench_client(pool_size: int = 20, settings: Settings | None = None):
+    engine = create_async_engine(
+        os.environ['BENCH_DATABASE_URL'], pool_size=pool_size
+    )
+    async with engine.begin() as conn:
+        await conn.run_sync(table_registry.metadata.create_all)
+
+    async def get_session_override():
+        async with AsyncSession(engine, expire_on_commit=False) as session:
+            yield session
+
+    app = create_app(settings)
+    # as leituras também vão para o banco do benchmark, não para réplicas
+    for dependency in (get_session, get_user_read_session):
+        app.dependency_overrides[dependency] = get_session_override
+    # os benchmarks medem o custo do login, não o limite de tentativas
+    app.dependency_overrides[check_login_throttle] = lambda: None
+    transport = httpx.ASGITransport(app=app)
+    try:
+        # o ASGITransport não dispara o lifespan, que configura os pools e
+        # caches a partir das settings
+        async with (
+            app.router.lifespan_context(app),
+            httpx.AsyncClient(
+                transport=transport, base_url='http://bench'
+            ) as client,
+        ):
+            yield client, engine
+    finally:
+        async with engine.begin() as conn:
+            await conn.run_sync(table_registry.metadata.drop_all)
+        await engine.dispose()
+
+
+async def create_user_and_token(
+    client: httpx.AsyncClient, username: str = 'bench'
+) -> tuple[dict, str]:
+    user = {
+        'username': username,
+        'email': f'{username}@bench.com',
+        'password': 'secret',
+    }
+    await client.post('/users/', json=user)
+    response = await client.post(
+        '/auth/token',
+        data={'username': user['email'], 'password': user['password']},
+    )
+    return user, response.json()['access_token']
@@ -0,0 +1,152 @@
+import asyncio
+import time
+from collections import deque
+from http import HTTPStatus
+
+from starlette.responses import JSONResponse
+
+from fastapi_zero.metrics import registry
+
+# prefixo da rota -> grupo com limite próprio; o resto (/, /metrics,
+# /health) nunca espera nem é recusado
+ROUTE_GROUPS = {'/auth': 'auth', '/users': 'users', '/todos': 'todos'}
+
+admission_limit = registry.gauge(
+    'http_admission_limit',
+    'Requisições simultâneas permitidas por grupo de rotas.',
+    ('group',),
+)
+admission_in_flight = registry.gauge(
+    'http_admission_in_flight',
+    'Requisições admitidas em andamento por grupo de rotas.',
+    ('group',),
+)
+admission_queued = registry.gauge(
+    'http_admission_queued',
+    'Requisições esperando vaga por grupo de rotas.',
+    ('group',),
+)
+admission_rejected = registry.counter(
+    'http_admission_rejected_total',
+    'Requisições recusadas com 503 (queue_full ou deadline).',
+    ('group', 'reason'),
+)
+admission_wait = registry.histogram(
+    'http_admission_wait_seconds',
+    'Espera na fila até a requisição ser admitida.',
+    ('group',),
+)
+
+
+def route_group(path: str) -> str | None:
+    for prefix, group in ROUTE_GROUPS.items():
+        if path == prefix or path.startswith(prefix + '/'):
+            return group
+    return None
+
+
+class Limiter:
+    # semáforo com fila limitada e prazo de espera. Os futures são criados
+    # no loop que está rodando na hora, então o limiter não fica preso ao
+    # loop em que foi construído
+    def __init__(self, group: str, limit: int, queue_size: int, timeout):
+        self.group = group
+        self.limit = limit
+        self.queue_size = queue_size
+        self.timeout = timeout
+        self.in_flight = 0
+        self._waiters = deque()
+        admission_limit.set(group, value=limit)
+
+    async def acquire(self) -> str | None:
+        # None = admitida; senão o motivo da recusa
+        if self.in_flight < self.limit and not self._waiters:
+            self._admit()
+            return None
+        if len(self._waiters) >= self.queue_size:
+            return 'queue_full'
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        admission_queued.inc(self.group)
+        try:
+            async with asyncio.timeout(self.timeout):
+                await future
+        except TimeoutError:
+            # a vaga pode ter chegado junto com o prazo: nesse caso é nossa
+            if not future.done() or future.cancelled():
+                return 'deadline'
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release()
+            raise
+        finally:
+            admission_queued.dec(self.group)
+            if not future.done():
+                future.cancel()
+            if future in self._waiters:
+                self._waiters.remove(future)
+        return None
+
+    def _admit(self):
+        self.in_flight += 1
+        admission_in_flight.inc(self.group)
+
+    def release(self):
+        # a vaga passa direto para o primeiro da fila ainda esperando
+        while self._waiters:
+            future = self._waiters.popleft()
+            if not future.done():
+                future.set_result(None)
+                return
+        self.in_flight -= 1
+        admission_in_flight.dec(self.group)
+
+
+class AdmissionMiddleware:
+    def __init__(
+        self,
+        app,
+        limits: dict[str, int],
+        queue_size: int = 100,
+        timeout: float = 1,
+        retry_after: int = 1,
+    ):
+        self.app = app
+        self.retry_after = retry_after
+        self.limiters = {
+            group: Limiter(group, limit, queue_size, timeout)
+            for group, limit in limits.items()
+            if limit > 0
+        }
+
+    async def __call__(self, scope, receive, send):
+        limiter = None
+        if scope['type'] == 'http':
+            limiter = self.limiters.get(route_group(scope['path']))
+        if limiter is None:
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        reason = await limiter.acquire()
+        if reason:
+            admission_rejected.inc(limiter.group, reason)
+            # recusada antes do roteamento: o MetricsMiddleware usa o grupo
+            # no lugar da rota
+            scope['admission_rejected'] = limiter.group
+            response = JSONResponse(
+                {'detail': 'Servidor sobrecarregado. Tente novamente.'},
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                headers={'Retry-After': str(self.retry_after)},
+            )
+            await response(scope, receive, send)
+            return
+
+        admission_wait.labels(limiter.group).observe(
+            time.perf_counter() - start
+        )
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release()
@@ -1,32 +1,124 @@
 import asyncio
 import sys
+from contextlib import asynccontextmanager, suppress
 from http import HTTPStatus
 
-from fastapi import FastAPI
-from fastapi.responses import HTMLResponse
+from fastapi import APIRouter, Depends, FastAPI
+from fastapi.responses import HTMLResponse, PlainTextResponse
 
-from fastapi_zero.routers import auth, todos, users
+from fastapi_zero.admission import AdmissionMiddleware
+from fastapi_zero.compression import CompressionMiddleware
+from fastapi_zero.database import db
+from fastapi_zero.metrics import registry
+from fastapi_zero.middleware import MetricsMiddleware, QueryStatsMiddleware
+from fastapi_zero.routers import auth, health, internal, todos, users
 from fastapi_zero.schemas import (
     Message,
 )
+from fastapi_zero.security import (
+    configure_security,
+    hash_pool,
+    verify_internal_token,
+)
+from fastapi_zero.settings import Settings, get_settings
+from fastapi_zero.warmup import run_warmup
 
 # a policy do psycopg nao costuma rodar bem no windows
 if sys.platform == 'win32':
     asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
 
+router = APIRouter()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    settings = app.state.settings
+    configure_security(settings)
+    users.configure_user_cache(settings)
+    auth.configure_login_throttle(settings)
+    engine = db.connect(settings)
+    warmup = None
+    if settings.WARMUP_ENABLED:
+        # em segundo plano: o servidor já aceita conexões (e /health/live)
+        # enquanto o aquecimento roda
+        app.state.ready = False
+        warmup = asyncio.create_task(run_warmup(app, engine, settings))
+    else:
+        app.state.ready = True
+    yield
+    if warmup:
+        warmup.cancel()
+        with suppress(asyncio.CancelledError):
+            await warmup
+    await db.dispose()
+    hash_pool.shutdown()
+
+
+def create_app(settings: Settings | None = None) -> FastAPI:
+    settings = settings or get_settings()
+    app = FastAPI(title='FastZero estudos', lifespan=lifespan)
+    app.state.settings = settings
+    app.include_router(router)
+    app.include_router(users.router)
+    app.include_router(auth.router)
+    app.include_router(todos.router)
+    app.include_router(internal.router)
+    app.include_router(health.router)
+    app.add_middleware(
+        QueryStatsMiddleware,
+        headers=settings.DB_QUERY_HEADERS,
+        n_plus_one=settings.DB_N_PLUS_ONE_THRESHOLD,
+    )
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        levels={
+            'gzip': settings.COMPRESSION_GZIP_LEVEL,
+            'br': settings.COMPRESSION_BROTLI_LEVEL,
+            'zstd': settings.COMPRESSION_ZSTD_LEVEL,
+        },
+        encodings=settings.COMPRESSION_ENCODINGS,
+    )
+    # dentro do MetricsMiddleware: os 503 também aparecem nas métricas HTTP,
+    # com route="<rejected:grupo>"
+    app.add_middleware(
+        AdmissionMiddleware,
+        limits=settings.ADMISSION_LIMITS,
+        queue_size=settings.ADMISSION_QUEUE_SIZE,
+        timeout=settings.ADMISSION_QUEUE_TIMEOUT,
+        retry_after=settings.ADMISSION_RETRY_AFTER,
+    )
+    app.add_middleware(MetricsMiddleware)
+    return app
 
-app = FastAPI(title='FastZero estudos')
-app.include_router(users.router)
-app.include_router(auth.router)
-app.include_router(todos.router)
 
+def __getattr__(name: str):
+    # `uvicorn fastapi_zero.app:app` e `fastapi dev` continuam funcionando:
+    # o app só é montado quando alguém o pede
+    if name == 'app':
+        app = globals()['app'] = create_app()
+        return app
+    raise AttributeError(f'module {__name__!r} has no attribute {name!r}')
 
-@app.get('/', status_code=HTTPStatus.OK, response_model=Message)
+
+@router.get('/', status_code=HTTPStatus.OK, response_model=Message)
 async def read_root():
     return {'message': 'Olá mundo!'}
 
 
-@app.get('/hello', status_code=HTTPStatus.OK, response_class=HTMLResponse)
+@router.get(
+    '/metrics',
+    response_class=PlainTextResponse,
+    dependencies=[Depends(verify_internal_token)],
+)
+async def metrics():
+    # formato texto de exposição do Prometheus
+    return PlainTextResponse(
+        registry.render(), media_type='text/plain; version=0.0.4'
+    )
+
+
+@router.get('/hello', status_code=HTTPStatus.OK, response_class=HTMLResponse)
 async def hello():
     return """
     <!DOCTYPE html>
@@ -0,0 +1,238 @@
+import time
+import zlib
+from http import HTTPStatus
+
+from fastapi_zero.metrics import registry
+
+# brotli e zstd são opcionais: sem o pacote instalado a codificação
+# simplesmente não é oferecida na negociação
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+COMPRESSIBLE_TYPES = (
+    'text/',
+    'application/json',
+    'application/x-ndjson',
+    'application/javascript',
+    'application/xml',
+)
+DEFAULT_LEVELS = {'gzip': 6, 'br': 4, 'zstd': 3}
+
+compression_bytes_in = registry.counter(
+    'http_compression_bytes_in_total',
+    'Bytes de resposta antes da compressão.',
+    ('encoding',),
+)
+compression_bytes_out = registry.counter(
+    'http_compression_bytes_out_total',
+    'Bytes de resposta depois da compressão.',
+    ('encoding',),
+)
+compression_cpu = registry.counter(
+    'http_compression_cpu_seconds_total',
+    'Tempo de CPU gasto comprimindo respostas.',
+    ('encoding',),
+)
+
+
+class GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # entrega o que já foi comprimido sem fechar o stream
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zlib.Z_FINISH)
+
+
+class BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+def available_encoders() -> dict:
+    encoders = {'gzip': GzipEncoder}
+    if brotli is not None:
+        encoders['br'] = BrotliEncoder
+    if zstandard is not None:
+        encoders['zstd'] = ZstdEncoder
+    return encoders
+
+
+def negotiate(accept_encoding: str, preference: list[str]) -> str | None:
+    # maior q do cliente vence; empate fica com a ordem de preferência
+    weights = {}
+    for item in accept_encoding.split(','):
+        name, _, params = item.strip().partition(';')
+        quality = 1.0
+        if params.strip().startswith('q='):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        weights[name.strip().lower()] = quality
+
+    wildcard = weights.get('*', 0)
+    candidates = [
+        (weights.get(name, wildcard), -rank, name)
+        for rank, name in enumerate(preference)
+    ]
+    quality, _, name = max(candidates, default=(0, 0, None))
+    return name if quality > 0 else None
+
+
+class CompressionMiddleware:
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        levels: dict[str, int] | None = None,
+        encodings: list[str] | None = None,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.levels = {**DEFAULT_LEVELS, **(levels or {})}
+        self.encoders = available_encoders()
+        self.preference = [
+            name
+            for name in encodings or ['zstd', 'br', 'gzip']
+            if name in self.encoders
+        ]
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope['headers'])
+        encoding = negotiate(
+            headers.get(b'accept-encoding', b'').decode('latin-1'),
+            self.preference,
+        )
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        encoder = self.encoders[encoding](self.levels[encoding])
+        responder = CompressionResponder(
+            send, encoding, encoder, self.minimum_size
+        )
+        await self.app(scope, receive, responder)
+
+
+class CompressionResponder:
+    # segura o http.response.start até ver o primeiro pedaço do corpo: só
+    # então dá para saber se a resposta é pequena ou em streaming
+    def __init__(self, send, encoding: str, encoder, minimum_size: int):
+        self.send = send
+        self.encoding = encoding
+        self.encoder = encoder
+        self.minimum_size = minimum_size
+        self.start = None
+        self.active = None
+
+    async def __call__(self, message):
+        if message['type'] == 'http.response.start':
+            if message['status'] == HTTPStatus.NOT_MODIFIED:
+                # o 304 responde por uma cópia que pode estar comprimida
+                headers = [*message['headers'], (b'vary', b'Accept-Encoding')]
+                message = {**message, 'headers': headers}
+            self.start = message
+            return
+        if message['type'] != 'http.response.body' or self.active is False:
+            await self.send(message)
+            return
+
+        body = message.get('body', b'')
+        more_body = message.get('more_body', False)
+        if self.active is None:
+            self.active = self._should_compress(body, more_body)
+            if not self.active:
+                await self.send(self.start)
+                await self.send(message)
+                return
+            data = self._encode(body, more_body)
+            # resposta inteira num pedaço só: o tamanho final já é conhecido
+            await self.send(
+                self._compressed_start(None if more_body else len(data))
+            )
+        else:
+            data = self._encode(body, more_body)
+
+        await self.send({
+            'type': 'http.response.body',
+            'body': data,
+            'more_body': more_body,
+        })
+
+    def _should_compress(self, body: bytes, more_body: bool) -> bool:
+        headers = dict(self.start['headers'])
+        content_type = headers.get(b'content-type', b'').decode('latin-1')
+        if b'content-encoding' in headers or not content_type.startswith(
+            COMPRESSIBLE_TYPES
+        ):
+            return False
+        return more_body or len(body) >= self.minimum_size
+
+    def _compressed_start(self, content_length: int | None) -> dict:
+        headers = []
+        for name, value in self.start['headers']:
+            if name == b'content-length':
+                continue
+            if name == b'etag' and not value.startswith(b'W/'):
+                # o corpo codificado não é byte a byte o original: a ETag
+                # continua forte (If-Match segue valendo) mas ganha o sufixo
+                # da codificação
+                suffix = b'-' + self.encoding.encode()
+                headers.append((name, value[:-1] + suffix + b'"'))
+            else:
+                headers.append((name, value))
+        headers.append((b'content-encoding', self.encoding.encode()))
+        headers.append((b'vary', b'Accept-Encoding'))
+        if content_length is not None:
+            headers.append((b'content-length', str(content_length).encode()))
+        return {**self.start, 'headers': headers}
+
+    def _encode(self, body: bytes, more_body: bool) -> bytes:
+        start = time.thread_time()
+        data = self.encoder.compress(body)
+        data += self.encoder.flush() if more_body else self.encoder.finish()
+        compression_cpu.inc(self.encoding, amount=time.thread_time() - start)
+        compression_bytes_in.inc(self.encoding, amount=len(body))
+        compression_bytes_out.inc(self.encoding, amount=len(data))
+        return data
@@ -0,0 +1,101 @@
+import asyncio
+import logging
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_zero.database import db
+
+logger = logging.getLogger(__name__)
+
+# trava só o usuário reconciliado, e só enquanto ele é recontado: o FOR
+# UPDATE no usuário barra novos todos dele (o INSERT pega FOR KEY SHARE
+# pela FK) e o FOR SHARE nos todos barra UPDATE/DELETE. Escritas que já
+# estavam em andamento terminam antes, e a contagem seguinte as enxerga
+LOCK_USER = 'SELECT id FROM users WHERE id = :user_id FOR UPDATE'
+LOCK_USER_TODOS = """
+SELECT count(*) FROM (
+    SELECT 1 FROM todos WHERE user_id = :user_id FOR SHARE
+) AS locked
+"""
+
+# compara a contagem real com os contadores do usuário e corrige só o que
+# divergiu; contador sem todos correspondentes é removido
+RECONCILE_USER = """
+WITH actual AS (
+    SELECT state, count(*) AS count
+    FROM todos WHERE user_id = :user_id GROUP BY state
+), counters AS (
+    SELECT state, count FROM todo_counters WHERE user_id = :user_id
+), drift AS (
+    SELECT
+        coalesce(a.state, c.state) AS state,
+        coalesce(a.count, 0) AS count
+    FROM actual AS a
+    FULL JOIN counters AS c ON c.state = a.state
+    WHERE a.count IS DISTINCT FROM c.count
+), fixed AS (
+    INSERT INTO todo_counters (user_id, state, count)
+    SELECT :user_id, state, count FROM drift WHERE count > 0
+    ON CONFLICT (user_id, state) DO UPDATE SET count = EXCLUDED.count
+), removed AS (
+    DELETE FROM todo_counters AS c
+    USING drift AS d
+    WHERE c.user_id = :user_id AND c.state = d.state AND d.count = 0
+)
+SELECT count(*) FROM drift
+"""
+
+# contadores de usuários que não existem mais
+REMOVE_ORPHANS = """
+DELETE FROM todo_counters AS c
+WHERE NOT EXISTS (SELECT 1 FROM users AS u WHERE u.id = c.user_id)
+"""
+
+USER_IDS = 'SELECT id FROM users WHERE id > :after ORDER BY id LIMIT :limit'
+
+
+async def reconcile_user_counters(session: AsyncSession, user_id: int) -> int:
+    # uma transação curta por usuário
+    params = {'user_id': user_id}
+    drifted = 0
+    if await session.scalar(text(LOCK_USER), params) is not None:
+        await session.execute(text(LOCK_USER_TODOS), params)
+        drifted = await session.scalar(text(RECONCILE_USER), params)
+    await session.commit()
+    return drifted
+
+
+async def reconcile_todo_counters(
+    session: AsyncSession, batch_size: int = 1000
+) -> int:
+    drifted = 0
+    after = 0
+    while True:
+        user_ids = (
+            await session.scalars(
+                text(USER_IDS), {'after': after, 'limit': batch_size}
+            )
+        ).all()
+        await session.commit()
+        if not user_ids:
+            break
+        for user_id in user_ids:
+            drifted += await reconcile_user_counters(session, user_id)
+        after = user_ids[-1]
+
+    removed = await session.execute(text(REMOVE_ORPHANS))
+    await session.commit()
+    return drifted + removed.rowcount
+
+
+async def main():
+    async with AsyncSession(db.engine) as session:
+        drifted = await reconcile_todo_counters(session)
+    logger.info('Contadores corrigidos: %d', drifted)
+    await db.dispose()
+
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
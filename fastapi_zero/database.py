@@ -1,10 +1,154 @@
+import time
+from itertools import cycle
+
+from sqlalchemy import event, exc
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from fastapi_zero.cache import TTLCache
+from fastapi_zero.metrics import Histogram, registry
+from fastapi_zero.queries import instrument
+from fastapi_zero.settings import Settings, get_settings
+
+
+class InstrumentedPool(AsyncAdaptedQueuePool):
+    # mede quanto tempo cada requisição espera por uma conexão do pool
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkout_seconds = Histogram()
+        self.timeouts = 0
+        self.connects = 0
+        event.listen(self, 'connect', self._on_connect)
+
+    def _on_connect(self, dbapi_connection, connection_record):
+        self.connects += 1
+
+    def connect(self):
+        start = time.perf_counter()
+        try:
+            return super().connect()
+        except exc.TimeoutError:
+            self.timeouts += 1
+            raise
+        finally:
+            self.checkout_seconds.observe(time.perf_counter() - start)
+
+    def stats(self) -> dict:
+        return {
+            'size': self.size(),
+            'checked_in': self.checkedin(),
+            'checked_out': self.checkedout(),
+            # overflow() começa em -pool_size; só interessam as conexões
+            # abertas além do pool
+            'overflow': max(self.overflow(), 0),
+            'connects': self.connects,
+            'timeouts': self.timeouts,
+            'checkout_seconds': self.checkout_seconds.snapshot(),
+        }
+
+
+def create_engine(settings: Settings, url: str):
+    return instrument(
+        create_async_engine(
+            url,
+            poolclass=InstrumentedPool,
+            pool_size=settings.DATABASE_POOL_SIZE,
+            max_overflow=settings.DATABASE_MAX_OVERFLOW,
+            pool_timeout=settings.DATABASE_POOL_TIMEOUT,
+            pool_recycle=settings.DATABASE_POOL_RECYCLE,
+            pool_pre_ping=settings.DATABASE_POOL_PRE_PING,
+            connect_args={
+                'prepare_threshold': settings.DATABASE_PREPARE_THRESHOLD
+            },
+        )
+    )
+
+
+class ReplicaRouter:
+    # distribui leituras entre as réplicas em rodízio; quem escreveu há
+    # pouco continua no primário para enxergar a própria escrita
+    def __init__(self, primary, replicas, pin_seconds: float, pin_size: int):
+        self.primary = primary
+        self.replicas = list(replicas)
+        self._next = cycle(self.replicas)
+        self.pins = TTLCache(maxsize=pin_size, ttl=pin_seconds)
+
+    def pin(self, user_id: int):
+        self.pins.set(user_id, True)
+
+    def engine_for(self, user_id: int | None = None):
+        if not self.replicas:
+            return self.primary
+        if user_id is not None and self.pins.get(user_id):
+            return self.primary
+        return next(self._next)
+
+
+class Database:
+    # os engines nascem no lifespan (ou no primeiro uso), não no import:
+    # importar o app não exige banco nem configuração pronta
+    def __init__(self):
+        self._engine = None
+        self._replicas = None
+
+    def connect(self, settings: Settings | None = None):
+        if self._engine is None:
+            settings = settings or get_settings()
+            self._engine = create_engine(settings, settings.DATABASE_URL)
+            self._replicas = ReplicaRouter(
+                self._engine,
+                [
+                    create_engine(settings, url)
+                    for url in settings.DATABASE_REPLICA_URLS
+                ],
+                pin_seconds=settings.DATABASE_READ_YOUR_WRITES_SECONDS,
+                pin_size=settings.DATABASE_READ_YOUR_WRITES_SIZE,
+            )
+        return self._engine
+
+    @property
+    def engine(self):
+        return self.connect()
+
+    @property
+    def replicas(self) -> ReplicaRouter:
+        self.connect()
+        return self._replicas
+
+    async def dispose(self):
+        if self._engine is None:
+            return
+        for engine in (self._engine, *self._replicas.replicas):
+            await engine.dispose()
+        self._engine = self._replicas = None
+
+
+db = Database()
+
+pool_connections = registry.gauge(
+    'db_pool_connections',
+    'Conexões do pool do primário por estado.',
+    ('state',),
+)
+pool_timeouts = registry.counter(
+    'db_pool_checkout_timeouts_total',
+    'Esperas por conexão que estouraram DATABASE_POOL_TIMEOUT.',
+)
+pool_checkout = registry.histogram(
+    'db_pool_checkout_seconds', 'Espera por uma conexão do pool.'
+)
 
-from fastapi_zero.settings import Settings
 
-engine = create_async_engine(Settings().DATABASE_URL)
+@registry.add_collector
+def collect_pool_metrics():
+    pool = db.engine.pool
+    stats = pool.stats()
+    for state in ('checked_in', 'checked_out', 'overflow'):
+        pool_connections.set(state, value=stats[state])
+    pool_timeouts.values[()] = stats['timeouts']
+    pool_checkout.values[()] = pool.checkout_seconds
 
 
 async def get_session():  # pragma: no cover
-    async with AsyncSession(engine, expire_on_commit=False) as session:
+    async with AsyncSession(db.engine, expire_on_commit=False) as session:
         yield session
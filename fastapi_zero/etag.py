@@ -0,0 +1,72 @@
+from datetime import datetime
+from hashlib import blake2b
+from http import HTTPStatus
+
+from fastapi import Response
+
+# sufixos que o CompressionMiddleware acrescenta às ETags fortes
+ENCODING_SUFFIXES = ('-gzip', '-br', '-zstd')
+
+
+def make_etag(*parts) -> str:
+    # ETag forte a partir de valores baratos de obter (contagem, max, ...)
+    digest = blake2b('|'.join(map(str, parts)).encode(), digest_size=16)
+    return f'"{digest.hexdigest()}"'
+
+
+def resource_etag(resource_id: int, updated_at: datetime) -> str:
+    return f'"{resource_id}-{updated_at.isoformat()}"'
+
+
+def strip_encoding(etag: str) -> str:
+    # "x-gzip" identifica a representação comprimida de "x"; as duas
+    # descrevem a mesma versão do recurso
+    for suffix in ENCODING_SUFFIXES:
+        if etag.endswith(f'{suffix}"'):
+            return etag.removesuffix(f'{suffix}"') + '"'
+    return etag
+
+
+def parse_resource_etag(etag: str) -> tuple[int, datetime] | None:
+    try:
+        resource_id, updated_at = strip_encoding(etag).strip('"').split('-', 1)
+        return int(resource_id), datetime.fromisoformat(updated_at)
+    except ValueError:
+        return None
+
+
+def _tags(header: str) -> list[str]:
+    return [tag.strip() for tag in header.split(',') if tag.strip()]
+
+
+def none_match(header: str | None, etag: str) -> str | None:
+    # If-None-Match usa comparação fraca: W/"x" casa com "x". Devolve a tag
+    # do cliente que casou, para o 304 repetir a ETag da cópia em cache
+    if header is None:
+        return None
+    current = strip_encoding(etag.removeprefix('W/'))
+    for tag in _tags(header):
+        if tag == '*':
+            return etag
+        if strip_encoding(tag.removeprefix('W/')) == current:
+            return tag
+    return None
+
+
+def if_match_tags(header: str | None) -> list[str] | None:
+    # If-Match usa comparação forte: ETags fracas nunca casam
+    if header is None:
+        return None
+    return [
+        strip_encoding(tag)
+        for tag in _tags(header)
+        if not tag.startswith('W/')
+    ]
+
+
+def not_modified(etag: str, headers: dict | None = None) -> Response:
+    # 304 sem corpo: a consulta da página e a serialização nem acontecem
+    return Response(
+        status_code=HTTPStatus.NOT_MODIFIED,
+        headers={**(headers or {}), 'ETag': etag},
+    )
@@ -0,0 +1,198 @@
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from itertools import islice
+from tempfile import SpooledTemporaryFile
+
+import psycopg
+from pydantic import ValidationError
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from fastapi_zero.schemas import TodoSchema
+
+# até esse tamanho o upload fica em memória, depois vai para o disco
+SPOOL_MAX_SIZE = 1024 * 1024
+
+# Content-Type do corpo -> formato lido por read_records
+IMPORT_FORMATS = {
+    'text/csv': 'csv',
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+}
+
+CREATE_STAGING = """
+CREATE TEMP TABLE todos_import (
+    title varchar NOT NULL,
+    description varchar NOT NULL,
+    state todostate NOT NULL
+) ON COMMIT DROP
+"""
+
+COPY_STAGING = 'COPY todos_import (title, description, state) FROM STDIN'
+
+MERGE_STAGING = """
+INSERT INTO todos (title, description, state, user_id)
+SELECT title, description, state, :user_id FROM todos_import
+"""
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def import_format_for(content_type: str) -> str | None:
+    media_type = content_type.partition(';')[0].strip().lower()
+    return IMPORT_FORMATS.get(media_type)
+
+
+async def spool_body(chunks, max_bytes: int) -> SpooledTemporaryFile:
+    # para de ler assim que passa do limite, sem gravar o resto em disco
+    spool = SpooledTemporaryFile(max_size=SPOOL_MAX_SIZE)
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if size > max_bytes:
+            spool.close()
+            raise UploadTooLarge
+        spool.write(chunk)
+    spool.seek(0)
+    return spool
+
+
+def read_records(spool, import_format: str):
+    # gera (linha, registro) com o número da linha do arquivo enviado
+    lines = io.TextIOWrapper(spool, encoding='utf-8', newline='')
+    if import_format == 'csv':
+        reader = csv.DictReader(lines)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield number, json.loads(line)
+        except json.JSONDecodeError as error:
+            yield number, error
+
+
+def validate_chunk(records) -> tuple[list, list]:
+    rows, errors = [], []
+    for number, record in records:
+        if isinstance(record, Exception):
+            errors.append({'line': number, 'detail': str(record)})
+            continue
+        try:
+            todo = TodoSchema.model_validate(record)
+        except ValidationError as error:
+            detail = '; '.join(
+                f'{".".join(map(str, e["loc"]))}: {e["msg"]}'
+                for e in error.errors()
+            )
+            errors.append({'line': number, 'detail': detail})
+            continue
+        rows.append((todo.title, todo.description, todo.state.value))
+    return rows, errors
+
+
+def chunked(records, size: int):
+    while chunk := list(islice(records, size)):
+        yield chunk
+
+
+async def copy_rows(session: AsyncSession, rows: list[tuple]):
+    # COPY ... FROM STDIN direto na conexão do psycopg usada pela sessão
+    connection = await session.connection()
+    raw_connection = await connection.get_raw_connection()
+    driver_connection = raw_connection.driver_connection
+    async with driver_connection.cursor() as cursor:
+        async with cursor.copy(COPY_STAGING) as copy:
+            for row in rows:
+                await copy.write_row(row)
+
+
+async def create_staging(session: AsyncSession):
+    await session.execute(text(CREATE_STAGING))
+
+
+async def merge_staging(session: AsyncSession, user_id: int) -> int:
+    result = await session.execute(text(MERGE_STAGING), {'user_id': user_id})
+    return result.rowcount
+
+
+def _event(**data) -> bytes:
+    return json.dumps(data).encode() + b'\n'
+
+
+@dataclass(slots=True)
+class ImportSummary:
+    max_errors: int
+    processed: int = 0
+    rejected: int = 0
+    errors: list = field(default_factory=list)
+
+    def add(self, size: int, errors: list):
+        self.processed += size
+        self.rejected += len(errors)
+        self.errors.extend(errors[: self.max_errors - len(self.errors)])
+
+
+async def load_staging(
+    session: AsyncSession,
+    spool,
+    import_format: str,
+    chunk_size: int,
+    summary: ImportSummary,
+):
+    # valida em blocos e carrega cada bloco com COPY na tabela temporária,
+    # enviando uma linha de progresso em NDJSON por bloco
+    await create_staging(session)
+    records = read_records(spool, import_format)
+    for chunk in chunked(records, chunk_size):
+        rows, errors = validate_chunk(chunk)
+        await copy_rows(session, rows)
+        summary.add(len(chunk), errors)
+        yield _event(
+            event='progress',
+            processed=summary.processed,
+            rejected=summary.rejected,
+        )
+
+
+async def stream_import(  # noqa: PLR0913, PLR0917
+    session: AsyncSession,
+    spool,
+    import_format: str,
+    user_id: int,
+    chunk_size: int,
+    max_errors: int,
+):
+    # só no fim copia tudo da tabela temporária para todos, numa única
+    # transação
+    summary = ImportSummary(max_errors)
+    try:
+        async for event in load_staging(
+            session, spool, import_format, chunk_size, summary
+        ):
+            yield event
+
+        imported = await merge_staging(session, user_id)
+        await session.commit()
+        yield _event(
+            event='done',
+            imported=imported,
+            rejected=summary.rejected,
+            errors=summary.errors,
+        )
+    except (DBAPIError, psycopg.Error, csv.Error, UnicodeDecodeError) as error:
+        await session.rollback()
+        yield _event(
+            event='error', processed=summary.processed, detail=str(error)
+        )
+    finally:
+        spool.close()
+        await session.close()
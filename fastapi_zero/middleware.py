@@ -0,0 +1,128 @@
+import time
+
+from fastapi_zero.metrics import registry
+from fastapi_zero.queries import logger as queries_logger
+from fastapi_zero.queries import track_queries
+
+UNMATCHED_ROUTE = '<unmatched>'
+
+http_requests = registry.counter(
+    'http_requests_total',
+    'Requisições HTTP concluídas.',
+    ('method', 'route', 'status'),
+)
+http_in_flight = registry.gauge(
+    'http_requests_in_flight',
+    'Requisições HTTP em andamento.',
+    ('method',),
+)
+http_latency = registry.histogram(
+    'http_request_duration_seconds',
+    'Latência das requisições HTTP até o fim da resposta.',
+    ('method', 'route'),
+)
+
+db_queries = registry.histogram(
+    'db_queries_per_request',
+    'Consultas SQL por requisição.',
+    ('route',),
+    buckets=(1, 2, 5, 10, 20, 50, 100),
+)
+db_time = registry.histogram(
+    'db_time_per_request_seconds',
+    'Tempo gasto no banco por requisição.',
+    ('route',),
+)
+db_n_plus_one = registry.counter(
+    'db_n_plus_one_total',
+    'Requisições que repetiram o mesmo SQL acima do limite.',
+    ('route',),
+)
+
+
+def route_template(scope) -> str:
+    # o roteador grava a rota casada no scope; o template evita uma série
+    # por id (/todos/1, /todos/2, ...)
+    route = scope.get('route')
+    if route is None and 'admission_rejected' in scope:
+        return f'<rejected:{scope["admission_rejected"]}>'
+    return getattr(route, 'path', UNMATCHED_ROUTE)
+
+
+class MetricsMiddleware:
+    # middleware ASGI puro: não envolve a resposta como o BaseHTTPMiddleware
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        method = scope['method']
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message['type'] == 'http.response.start':
+                status = message['status']
+            await send(message)
+
+        http_in_flight.inc(method)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_in_flight.dec(method)
+            route = route_template(scope)
+            http_requests.inc(method, route, str(status))
+            http_latency.labels(method, route).observe(
+                time.perf_counter() - start
+            )
+
+
+class QueryStatsMiddleware:
+    # atribui as consultas do engine à requisição corrente
+    def __init__(self, app, headers: bool = False, n_plus_one: int = 0):
+        self.app = app
+        self.headers = headers
+        self.n_plus_one = n_plus_one
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_wrapper(message):
+                # em respostas em streaming os cabeçalhos saem antes do fim,
+                # então contam só as consultas feitas até ali
+                if self.headers and message['type'] == 'http.response.start':
+                    message['headers'] = [
+                        *message.get('headers', []),
+                        (b'x-db-queries', str(stats.count).encode()),
+                        (b'x-db-time', f'{stats.seconds * 1000:.3f}'.encode()),
+                    ]
+                await send(message)
+
+            try:
+                await self.app(scope, receive, send_wrapper)
+            finally:
+                self.record(route_template(scope), stats)
+
+    def record(self, route, stats):
+        db_queries.labels(route).observe(stats.count)
+        db_time.labels(route).observe(stats.seconds)
+        if not self.n_plus_one:
+            return
+        repeated = stats.repeated(self.n_plus_one)
+        if repeated:
+            db_n_plus_one.inc(route)
+            for statement, times in repeated:
+                queries_logger.warning(
+                    'Possível N+1 em %s: %d execuções de %s',
+                    route,
+                    times,
+                    statement,
+                )
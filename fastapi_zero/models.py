@@ -1,7 +1,7 @@
 from datetime import datetime
 from enum import Enum
 
-from sqlalchemy import ForeignKey, func
+from sqlalchemy import DDL, ForeignKey, Index, event, func
 from sqlalchemy.orm import Mapped, mapped_column, registry, relationship
 
 table_registry = registry()
@@ -22,6 +22,10 @@ class User:
     username: Mapped[str] = mapped_column(unique=True)
     email: Mapped[str] = mapped_column(unique=True)
     password: Mapped[str]
+    # incrementada para revogar os tokens já emitidos
+    token_version: Mapped[int] = mapped_column(
+        init=False, default=0, server_default='0'
+    )
     created_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now()
     )
@@ -29,13 +33,47 @@ class User:
         init=False, server_default=func.now(), server_onupdate=func.now()
     )
     todos: Mapped[list['Todo']] = relationship(
-        init=False, cascade='all, delete-orphan', lazy='selectin'
+        init=False,
+        cascade='all, delete-orphan',
+        lazy='raise',
+        passive_deletes=True,
     )
 
 
 @table_registry.mapped_as_dataclass
 class Todo:
     __tablename__ = 'todos'
+    __table_args__ = (
+        # todas as consultas das rotas filtram por user_id e ordenam por id.
+        # O INCLUDE cobre o count/max(updated_at) do ETag de GET /todos/,
+        # que assim não precisa ler a tabela
+        Index(
+            'ix_todos_user_id_id',
+            'user_id',
+            'id',
+            postgresql_include=['updated_at', 'state'],
+        ),
+        Index(
+            'ix_todos_user_id_state_id',
+            'user_id',
+            'state',
+            'id',
+            postgresql_include=['updated_at'],
+        ),
+        # índices trigram para os filtros de substring (ILIKE '%x%')
+        Index(
+            'ix_todos_title_trgm',
+            'title',
+            postgresql_using='gin',
+            postgresql_ops={'title': 'gin_trgm_ops'},
+        ),
+        Index(
+            'ix_todos_description_trgm',
+            'description',
+            postgresql_using='gin',
+            postgresql_ops={'description': 'gin_trgm_ops'},
+        ),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True, init=False)
     title: Mapped[str]
@@ -47,4 +85,95 @@ class Todo:
     updated_at: Mapped[datetime] = mapped_column(
         init=False, server_default=func.now(), server_onupdate=func.now()
     )
-    user_id: Mapped[int] = mapped_column(ForeignKey('users.id'))
+    user_id: Mapped[int] = mapped_column(
+        ForeignKey('users.id', ondelete='CASCADE')
+    )
+
+
+@table_registry.mapped_as_dataclass
+class TodoCounter:
+    # quantidade de todos por usuário e estado, mantida pelos triggers de
+    # todos. Sem FK para users: o CASCADE que apaga o usuário dispara os
+    # triggers, que ainda precisam atualizar (e remover) estas linhas
+    __tablename__ = 'todo_counters'
+
+    user_id: Mapped[int] = mapped_column(primary_key=True)
+    state: Mapped[TodoState] = mapped_column(primary_key=True)
+    count: Mapped[int]
+
+
+# um único UPSERT por comando, agrupado por (user_id, state), usando as
+# transition tables: importações e operações em lote pagam o mesmo que uma
+# linha só. A ordenação fixa das linhas evita deadlock entre transações
+TODO_COUNTERS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_counters_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO todo_counters (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_rows
+        GROUP BY user_id, state ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_counters.count + EXCLUDED.count;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO todo_counters (user_id, state, count)
+        SELECT user_id, state, -count(*) FROM old_rows
+        GROUP BY user_id, state ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_counters.count + EXCLUDED.count;
+    ELSE
+        INSERT INTO todo_counters (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT user_id, state, -1 FROM old_rows
+        ) AS changes
+        GROUP BY user_id, state HAVING sum(delta) <> 0
+        ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_counters.count + EXCLUDED.count;
+    END IF;
+
+    DELETE FROM todo_counters
+    WHERE count = 0 AND user_id IN (SELECT user_id FROM old_rows);
+    RETURN NULL;
+END;
+$$
+"""
+TODO_COUNTERS_TRIGGERS = (
+    """
+    CREATE TRIGGER todo_counters_insert AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_apply()
+    """,
+    """
+    CREATE TRIGGER todo_counters_update AFTER UPDATE ON todos
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_apply()
+    """,
+    """
+    CREATE TRIGGER todo_counters_delete AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_apply()
+    """,
+)
+
+
+event.listen(
+    table_registry.metadata,
+    'before_create',
+    DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'),
+)
+event.listen(
+    table_registry.metadata, 'after_create', DDL(TODO_COUNTERS_FUNCTION)
+)
+for trigger in TODO_COUNTERS_TRIGGERS:
+    event.listen(table_registry.metadata, 'after_create', DDL(trigger))
+event.listen(
+    table_registry.metadata,
+    'after_drop',
+    DDL('DROP FUNCTION IF EXISTS todo_counters_apply()'),
+)
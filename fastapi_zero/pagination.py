@@ -0,0 +1,37 @@
+import base64
+import binascii
+import json
+
+from sqlalchemy import Select
+
+
+def encode_cursor(last_id: int) -> str:
+    raw = json.dumps({'id': last_id}, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> int:
+    padding = '=' * (-len(cursor) % 4)
+    try:
+        last_id = json.loads(base64.urlsafe_b64decode(cursor + padding))['id']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError('Cursor inválido.')
+    # bool é subclasse de int: {"id": true} não pode virar id 1
+    if type(last_id) is not int:
+        raise ValueError('Cursor inválido.')
+    return last_id
+
+
+def paginate(query: Select, column, after_id: int | None, limit, offset):
+    # keyset: a página N custa o mesmo que a primeira quando há cursor;
+    # busca um item a mais para saber se existe próxima página
+    if after_id is not None:
+        query = query.where(column > after_id)
+    return query.order_by(column).limit(limit + 1).offset(offset)
+
+
+def next_page(items: list, limit: int, key=lambda item: item.id):
+    if len(items) <= limit or limit == 0:
+        return items[:limit], None
+    page = items[:limit]
+    return page, encode_cursor(key(page[-1]))
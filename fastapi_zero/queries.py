@@ -0,0 +1,82 @@
+import logging
+import time
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+from sqlalchemy import event
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(slots=True)
+class QueryStats:
+    # consultas atribuídas a uma requisição
+    count: int = 0
+    seconds: float = 0.0
+    statements: Counter = field(default_factory=Counter)
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        # o mesmo SQL várias vezes numa requisição costuma ser um N+1
+        return [
+            (statement, times)
+            for statement, times in self.statements.items()
+            if times >= threshold
+        ]
+
+
+current_stats: ContextVar[QueryStats | None] = ContextVar(
+    'current_stats', default=None
+)
+
+
+@contextmanager
+def track_queries():
+    stats = QueryStats()
+    reset = current_stats.set(stats)
+    try:
+        yield stats
+    finally:
+        current_stats.reset(reset)
+
+
+def _before_cursor_execute(conn, cursor, statement, *args):
+    # uma consulta por vez na conexão: um valor só, sobrescrito pela próxima
+    conn.info['query_start'] = time.perf_counter()
+
+
+def _record(conn, statement):
+    start = conn.info.pop('query_start', None)
+    stats = current_stats.get()
+    if stats is None or start is None:
+        return
+    stats.count += 1
+    stats.seconds += time.perf_counter() - start
+    stats.statements[statement] += 1
+
+
+def _after_cursor_execute(conn, cursor, statement, *args):
+    _record(conn, statement)
+
+
+def _handle_error(context):
+    # o after_cursor_execute não roda quando o comando falha
+    if context.connection is not None and context.statement is not None:
+        _record(context.connection, context.statement)
+
+
+def instrument(engine):
+    # fora de track_queries os eventos só custam o perf_counter
+    sync_engine = getattr(engine, 'sync_engine', engine)
+    if not event.contains(
+        sync_engine, 'before_cursor_execute', _before_cursor_execute
+    ):
+        event.listen(
+            sync_engine, 'before_cursor_execute', _before_cursor_execute
+        )
+        event.listen(
+            sync_engine, 'after_cursor_execute', _after_cursor_execute
+        )
+        event.listen(sync_engine, 'handle_error', _handle_error)
+    return engine
@@ -1,7 +1,7 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -9,20 +9,58 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi_zero.models import User
 from fastapi_zero.schemas import Token
 from fastapi_zero.security import (
-    create_access_token,
+    create_user_token,
     get_session,
-    verify_password,
+    verify_password_async,
 )
+from fastapi_zero.settings import Settings, get_app_settings
+from fastapi_zero.throttle import MemoryBackend, Throttle
 
 router = APIRouter(prefix='/auth', tags=['auth'])
 T_Session = Annotated[AsyncSession, Depends(get_session)]
 OAuth2Form = Annotated[OAuth2PasswordRequestForm, Depends()]
+T_Settings = Annotated[Settings, Depends(get_app_settings)]
+# sem limites até o lifespan chamar configure_login_throttle
+login_throttle = Throttle(MemoryBackend(maxsize=0), {})
 
 
-@router.post('/token', response_model=Token)
+def configure_login_throttle(settings: Settings):
+    login_throttle.configure({
+        'ip': (settings.LOGIN_IP_BURST, settings.LOGIN_IP_PER_MINUTE / 60),
+        'account': (
+            settings.LOGIN_ACCOUNT_BURST,
+            settings.LOGIN_ACCOUNT_PER_MINUTE / 60,
+        ),
+    })
+    # um backend compartilhado cuida do próprio tamanho
+    if isinstance(login_throttle.backend, MemoryBackend):
+        login_throttle.backend.maxsize = settings.LOGIN_THROTTLE_SIZE
+
+
+async def check_login_throttle(request: Request, form_data: OAuth2Form):
+    # roda antes da sessão e do argon2: tentativa recusada não custa
+    # consulta nem hash
+    retry_after = await login_throttle.check(
+        ip=request.client.host if request.client else None,
+        account=form_data.username.lower(),
+    )
+    if retry_after:
+        raise HTTPException(
+            status_code=HTTPStatus.TOO_MANY_REQUESTS,
+            detail='Muitas tentativas de login. Tente novamente mais tarde.',
+            headers={'Retry-After': str(retry_after)},
+        )
+
+
+@router.post(
+    '/token',
+    response_model=Token,
+    dependencies=[Depends(check_login_throttle)],
+)
 async def login_for_access_token(
     form_data: OAuth2Form,
     session: T_Session,
+    settings: T_Settings,
 ):
     user_db = await session.scalar(
         select(User).where(User.email == form_data.username)
@@ -33,12 +71,14 @@ async def login_for_access_token(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Email ou senha incorretos.',
         )
-    valid_password = verify_password(form_data.password, user_db.password)
+    valid_password = await verify_password_async(
+        form_data.password, user_db.password
+    )
     if not valid_password:
         raise HTTPException(
             status_code=HTTPStatus.UNAUTHORIZED,
             detail='Email ou senha incorretos.',
         )
 
-    access_token = create_access_token({'sub': user_db.email})
+    access_token = create_user_token(user_db, settings)
     return {'access_token': access_token, 'token_type': 'Bearer'}
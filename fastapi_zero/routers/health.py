@@ -0,0 +1,24 @@
+from http import HTTPStatus
+
+from fastapi import APIRouter, HTTPException, Request
+
+from fastapi_zero.schemas import Message
+
+router = APIRouter(prefix='/health', tags=['health'])
+
+
+@router.get('/live', response_model=Message)
+async def live():
+    return {'message': 'OK'}
+
+
+@router.get('/ready', response_model=Message)
+async def ready(request: Request):
+    # só entra no balanceador depois do aquecimento
+    if not getattr(request.app.state, 'ready', False):
+        raise HTTPException(
+            status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+            detail='Aquecimento em andamento.',
+            headers={'Retry-After': '1'},
+        )
+    return {'message': 'OK'}
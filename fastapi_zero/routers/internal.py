@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends
+
+from fastapi_zero.database import db
+from fastapi_zero.routers.users import user_cache
+from fastapi_zero.schemas import InternalStats
+from fastapi_zero.security import principal_cache, verify_internal_token
+
+router = APIRouter(
+    prefix='/internal',
+    tags=['internal'],
+    dependencies=[Depends(verify_internal_token)],
+)
+
+
+@router.get('/stats', response_model=InternalStats)
+async def read_stats():
+    return {
+        'principal_cache': principal_cache.stats(),
+        'user_cache': user_cache.stats(),
+        'pool': db.engine.pool.stats(),
+    }
@@ -1,30 +1,133 @@
+import csv
+import io
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Request,
+    Response,
+)
+from fastapi.responses import StreamingResponse
+from sqlalchemy import (
+    Integer,
+    String,
+    cast,
+    column,
+    delete,
+    func,
+    insert,
+    select,
+    update,
+    values,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from fastapi_zero.database import get_session
-from fastapi_zero.models import Todo, User
+from fastapi_zero.etag import (
+    if_match_tags,
+    make_etag,
+    none_match,
+    not_modified,
+    parse_resource_etag,
+    resource_etag,
+)
+from fastapi_zero.importer import (
+    UploadTooLarge,
+    import_format_for,
+    spool_body,
+    stream_import,
+)
+from fastapi_zero.models import Todo, TodoCounter, TodoState
+from fastapi_zero.pagination import next_page, paginate
 from fastapi_zero.schemas import (
     FilterTodo,
+    FilterTodoExport,
+    FilterTodoFields,
     Message,
+    TodoBatchResponse,
+    TodoBatchUpdate,
     TodoList,
     TodoPublic,
     TodoSchema,
+    TodoStats,
     TodoUpdate,
 )
-from fastapi_zero.security import get_current_user
+from fastapi_zero.security import (
+    Principal,
+    get_current_principal,
+    get_user_read_session,
+)
+from fastapi_zero.serialization import (
+    json_response,
+    public_columns,
+    rows_to_dicts,
+)
+from fastapi_zero.settings import Settings, get_app_settings
 
 router = APIRouter(prefix='/todos', tags=['todos'])
+TODO_PUBLIC_COLUMNS = public_columns(Todo, TodoPublic)
 T_Session = Annotated[AsyncSession, Depends(get_session)]
-T_Current_User = Annotated[User, Depends(get_current_user)]
+T_ReadSession = Annotated[AsyncSession, Depends(get_user_read_session)]
+T_Current_User = Annotated[Principal, Depends(get_current_principal)]
+T_IfNoneMatch = Annotated[str | None, Header()]
+T_IfMatch = Annotated[str | None, Header()]
+T_Settings = Annotated[Settings, Depends(get_app_settings)]
+
+
+def _contains(column, text: str):
+    # ILIKE usa os índices trigram (pg_trgm) de title e description
+    escaped = (
+        text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    )
+    return column.ilike(f'%{escaped}%', escape='\\')
+
+
+def filter_todos(query, user_id: int, todo_filter: FilterTodoFields):
+    query = query.where(Todo.user_id == user_id)
+
+    if todo_filter.title:
+        query = query.filter(_contains(Todo.title, todo_filter.title))
+
+    if todo_filter.description:
+        query = query.filter(
+            _contains(Todo.description, todo_filter.description)
+        )
+
+    if todo_filter.state:
+        query = query.filter(Todo.state == todo_filter.state)
+
+    return query
+
+
+def todo_etag_query(user_id: int, todo_filter: FilterTodoFields):
+    return filter_todos(
+        select(func.count(), func.max(Todo.updated_at)).select_from(Todo),
+        user_id,
+        todo_filter,
+    )
+
+
+def todo_page_query(user_id: int, todo_filter: FilterTodo):
+    return paginate(
+        filter_todos(select(*TODO_PUBLIC_COLUMNS), user_id, todo_filter),
+        Todo.id,
+        todo_filter.after_id,
+        todo_filter.limit,
+        todo_filter.offset,
+    )
 
 
 @router.post('/', response_model=TodoPublic, status_code=HTTPStatus.CREATED)
 async def create_todo(
-    todo: TodoSchema, current_user: T_Current_User, session: T_Session
+    todo: TodoSchema,
+    current_user: T_Current_User,
+    session: T_Session,
+    response: Response,
 ):
     db_todo = Todo(
         user_id=current_user.id,
@@ -32,72 +135,376 @@ async def create_todo(
         description=todo.description,
         state=todo.state,
     )
+    # o INSERT já traz id, created_at e updated_at via RETURNING
     session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
+    response.headers['ETag'] = resource_etag(db_todo.id, db_todo.updated_at)
     return db_todo
 
 
 @router.get('/', response_model=TodoList)
 async def list_todos(
     current_user: T_Current_User,
-    session: T_Session,
+    session: T_ReadSession,
     todo_filter: Annotated[FilterTodo, Query()],
+    if_none_match: T_IfNoneMatch = None,
 ):
-    query = select(Todo).where(Todo.user_id == current_user.id)
+    # contagem e último updated_at do filtro mudam a cada insert, update ou
+    # delete; junto com os parâmetros da página identificam a resposta
+    total, last_update = (
+        await session.execute(todo_etag_query(current_user.id, todo_filter))
+    ).one()
+    etag = make_etag(
+        current_user.id, total, last_update, todo_filter.model_dump_json()
+    )
+    if matched := none_match(if_none_match, etag):
+        return not_modified(matched)
 
-    if todo_filter.title:
-        query = query.filter(Todo.title.contains(todo_filter.title))
+    todos = await session.execute(
+        todo_page_query(current_user.id, todo_filter)
+    )
+    todos, next_cursor = next_page(todos.all(), todo_filter.limit)
+    return json_response(
+        {'todos': rows_to_dicts(todos), 'next_cursor': next_cursor},
+        headers={'ETag': etag},
+    )
 
-    if todo_filter.description:
-        query = query.filter(
-            Todo.description.contains(todo_filter.description)
+
+@router.get('/stats', response_model=TodoStats)
+async def read_todo_stats(
+    current_user: T_Current_User, session: T_ReadSession
+):
+    # lê os contadores mantidos pelos triggers: no máximo uma linha por
+    # estado, qualquer que seja o número de todos do usuário
+    counters = await session.execute(
+        select(TodoCounter.state, TodoCounter.count).where(
+            TodoCounter.user_id == current_user.id
         )
+    )
+    states = dict.fromkeys(TodoState, 0)
+    states.update(counters.tuples().all())
+    return {'total': sum(states.values()), 'states': states}
 
-    if todo_filter.state:
-        query = query.filter(Todo.state == todo_filter.state)
 
-    todos = await session.scalars(
-        query.limit(todo_filter.limit).offset(todo_filter.offset)
+EXPORT_COLUMNS = (
+    'id',
+    'title',
+    'description',
+    'state',
+    'created_at',
+    'updated_at',
+)
+
+
+def _to_ndjson(todos) -> bytes:
+    return b''.join(
+        TodoPublic
+        .model_validate(todo, from_attributes=True)
+        .model_dump_json()
+        .encode()
+        + b'\n'
+        for todo in todos
+    )
+
+
+def _to_csv(todos) -> bytes:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for todo in todos:
+        writer.writerow([
+            todo.id,
+            todo.title,
+            todo.description,
+            todo.state.value,
+            todo.created_at.isoformat(),
+            todo.updated_at.isoformat(),
+        ])
+    return buffer.getvalue().encode()
+
+
+async def _stream_export(
+    session: AsyncSession, query, export_format: str, chunk_size: int
+):
+    # a sessão da dependência pode já ter sido fechada quando a resposta
+    # começa a ser enviada; o AsyncSession reabre a conexão e ela é
+    # devolvida ao pool no finally
+    try:
+        if export_format == 'csv':
+            yield (','.join(EXPORT_COLUMNS) + '\r\n').encode()
+
+        serialize = _to_csv if export_format == 'csv' else _to_ndjson
+        result = await session.stream_scalars(
+            query.execution_options(yield_per=chunk_size)
+        )
+        async for todos in result.partitions():
+            yield serialize(todos)
+    finally:
+        await session.close()
+
+
+@router.get('/export', response_class=StreamingResponse)
+async def export_todos(
+    current_user: T_Current_User,
+    session: T_Session,
+    export_filter: Annotated[FilterTodoExport, Query()],
+    settings: T_Settings,
+):
+    query = filter_todos(select(Todo), current_user.id, export_filter)
+    media_type = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+    return StreamingResponse(
+        _stream_export(
+            session,
+            query.order_by(Todo.id),
+            export_filter.format,
+            settings.TODO_EXPORT_CHUNK_SIZE,
+        ),
+        media_type=media_type[export_filter.format],
+        headers={
+            'Content-Disposition': (
+                f'attachment; filename="todos.{export_filter.format}"'
+            )
+        },
+    )
+
+
+@router.post('/import', response_class=StreamingResponse)
+async def import_todos(
+    request: Request,
+    current_user: T_Current_User,
+    session: T_Session,
+    settings: T_Settings,
+):
+    # corpo em CSV (text/csv, com cabeçalho) ou NDJSON, um TodoSchema por
+    # linha; a resposta é um NDJSON com o progresso e o resumo no final
+    import_format = import_format_for(request.headers.get('content-type', ''))
+    if import_format is None:
+        raise HTTPException(
+            status_code=HTTPStatus.UNSUPPORTED_MEDIA_TYPE,
+            detail='Envie text/csv ou application/x-ndjson.',
+        )
+
+    too_large = HTTPException(
+        status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+        detail=(
+            f'O arquivo aceita no máximo {settings.TODO_IMPORT_MAX_BYTES} '
+            'bytes.'
+        ),
     )
-    return {'todos': todos.all()}
+    content_length = request.headers.get('content-length', '')
+    if (
+        content_length.isdigit()
+        and int(content_length) > settings.TODO_IMPORT_MAX_BYTES
+    ):
+        raise too_large
+    try:
+        spool = await spool_body(
+            request.stream(), settings.TODO_IMPORT_MAX_BYTES
+        )
+    except UploadTooLarge:
+        raise too_large
+    return StreamingResponse(
+        stream_import(
+            session,
+            spool,
+            import_format,
+            current_user.id,
+            settings.TODO_IMPORT_CHUNK_SIZE,
+            settings.TODO_IMPORT_MAX_ERRORS,
+        ),
+        media_type='application/x-ndjson',
+    )
+
+
+def _check_batch_size(items: list, settings: Settings):
+    if len(items) > settings.TODO_BATCH_MAX_SIZE:
+        raise HTTPException(
+            status_code=HTTPStatus.REQUEST_ENTITY_TOO_LARGE,
+            detail=(
+                f'O lote aceita no máximo {settings.TODO_BATCH_MAX_SIZE} '
+                'itens.'
+            ),
+        )
+
+
+def _batch_results(ids: list[int], found: dict, status: HTTPStatus):
+    return {
+        'results': [
+            {'id': todo_id, 'status': status, 'todo': found[todo_id]}
+            if todo_id in found
+            else {
+                'id': todo_id,
+                'status': HTTPStatus.NOT_FOUND,
+                'detail': 'Task não encontrada.',
+            }
+            for todo_id in ids
+        ]
+    }
+
+
+@router.post(
+    '/batch',
+    response_model=TodoBatchResponse,
+    status_code=HTTPStatus.CREATED,
+)
+async def create_todos_batch(
+    todos: list[TodoSchema],
+    current_user: T_Current_User,
+    session: T_Session,
+    settings: T_Settings,
+):
+    _check_batch_size(todos, settings)
+    if not todos:
+        return {'results': []}
+
+    # um INSERT com várias linhas (insertmanyvalues) numa transação
+    created = await session.scalars(
+        insert(Todo).returning(Todo, sort_by_parameter_order=True),
+        [{**todo.model_dump(), 'user_id': current_user.id} for todo in todos],
+    )
+    created = created.all()
+    await session.commit()
+    return _batch_results(
+        [todo.id for todo in created],
+        {todo.id: todo for todo in created},
+        HTTPStatus.CREATED,
+    )
+
+
+@router.patch('/batch', response_model=TodoBatchResponse)
+async def patch_todos_batch(
+    todos: list[TodoBatchUpdate],
+    current_user: T_Current_User,
+    session: T_Session,
+    settings: T_Settings,
+):
+    _check_batch_size(todos, settings)
+    ids = [todo.id for todo in todos]
+    if len(set(ids)) != len(ids):
+        raise HTTPException(
+            status_code=HTTPStatus.UNPROCESSABLE_ENTITY,
+            detail='IDs repetidos no lote.',
+        )
+    if not todos:
+        return {'results': []}
+
+    # UPDATE ... FROM (VALUES ...): campos nulos mantêm o valor atual
+    changes = values(
+        column('id', Integer),
+        column('title', String),
+        column('description', String),
+        column('state', String),
+        name='changes',
+    ).data([
+        (
+            todo.id,
+            todo.title,
+            todo.description,
+            todo.state and todo.state.value,
+        )
+        for todo in todos
+    ])
+    query = (
+        update(Todo)
+        .where(Todo.id == changes.c.id, Todo.user_id == current_user.id)
+        .values(
+            title=func.coalesce(changes.c.title, Todo.title),
+            description=func.coalesce(changes.c.description, Todo.description),
+            state=func.coalesce(
+                cast(changes.c.state, Todo.__table__.c.state.type),
+                Todo.state,
+            ),
+            updated_at=func.now(),
+        )
+        .returning(Todo)
+    )
+    updated = await session.scalars(query)
+    updated = {todo.id: todo for todo in updated}
+    await session.commit()
+    return _batch_results(ids, updated, HTTPStatus.OK)
+
+
+@router.delete('/batch', response_model=TodoBatchResponse)
+async def delete_todos_batch(
+    ids: list[int],
+    current_user: T_Current_User,
+    session: T_Session,
+    settings: T_Settings,
+):
+    _check_batch_size(ids, settings)
+    deleted = await session.scalars(
+        delete(Todo)
+        .where(Todo.id.in_(ids), Todo.user_id == current_user.id)
+        .returning(Todo.id)
+    )
+    deleted = {todo_id: None for todo_id in deleted}
+    await session.commit()
+    return _batch_results(ids, deleted, HTTPStatus.OK)
 
 
 @router.delete('/{todo_id}', response_model=Message)
 async def delete_todo(
     session: T_Session, todo_id: int, current_user: T_Current_User
 ):
-    todo = await session.scalar(
-        select(Todo).where(Todo.id == todo_id, Todo.user_id == current_user.id)
+    deleted_id = await session.scalar(
+        delete(Todo)
+        .where(Todo.id == todo_id, Todo.user_id == current_user.id)
+        .returning(Todo.id)
     )
 
-    if not todo:
+    if not deleted_id:
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task não encontrada.'
         )
-    await session.delete(todo)
+    await session.commit()
     return {'message': 'Task deletada.'}
 
 
 @router.patch('/{todo_id}', response_model=TodoPublic)
-async def patch_todo(
+async def patch_todo(  # noqa: PLR0913, PLR0917
     todo_id: int,
     session: T_Session,
     current_user: T_Current_User,
     todo: TodoUpdate,
+    response: Response,
+    if_match: T_IfMatch = None,
 ):
-    db_todo = await session.scalar(
-        select(Todo).where(Todo.id == todo_id, Todo.user_id == current_user.id)
-    )
+    changes = todo.model_dump(exclude_unset=True)
+    owned = (Todo.id == todo_id, Todo.user_id == current_user.id)
+    where = list(owned)
+    tags = if_match_tags(if_match)
+    if tags is not None and '*' not in tags:
+        # a versão esperada entra no WHERE: checagem e escrita atômicas
+        versions = [
+            version[1]
+            for version in map(parse_resource_etag, tags)
+            if version and version[0] == todo_id
+        ]
+        where.append(Todo.updated_at.in_(versions))
+
+    # um único UPDATE ... RETURNING, sem o SELECT antes nem o refresh depois
+    if changes:
+        query = (
+            update(Todo)
+            .where(*where)
+            .values(**changes, updated_at=func.now())
+            .returning(Todo)
+        )
+    else:
+        query = select(Todo).where(*where)
+
+    db_todo = await session.scalar(query)
     if not db_todo:
+        if len(where) > len(owned) and await session.scalar(
+            select(Todo.id).where(*owned)
+        ):
+            raise HTTPException(
+                status_code=HTTPStatus.PRECONDITION_FAILED,
+                detail='A task foi alterada por outra requisição.',
+            )
         raise HTTPException(
             status_code=HTTPStatus.NOT_FOUND, detail='Task não encontrada.'
         )
 
-    for key, value in todo.model_dump(exclude_unset=True).items():
-        setattr(db_todo, key, value)
-
-    session.add(db_todo)
     await session.commit()
-    await session.refresh(db_todo)
+    response.headers['ETag'] = resource_etag(db_todo.id, db_todo.updated_at)
     return db_todo
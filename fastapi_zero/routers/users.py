@@ -1,12 +1,23 @@
 from http import HTTPStatus
 from typing import Annotated
 
-from fastapi import APIRouter, Depends, HTTPException, Query
-from sqlalchemy import select
+from fastapi import (
+    APIRouter,
+    Depends,
+    Header,
+    HTTPException,
+    Query,
+    Response,
+)
+from pydantic_core import to_json
+from sqlalchemy import delete, func, select, update
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from fastapi_zero.cache import TTLCache
+from fastapi_zero.etag import none_match, not_modified, resource_etag
 from fastapi_zero.models import User
+from fastapi_zero.pagination import next_page, paginate
 from fastapi_zero.schemas import (
     FilterPage,
     Message,
@@ -15,15 +26,49 @@ from fastapi_zero.schemas import (
     UserSchema,
 )
 from fastapi_zero.security import (
-    get_current_user,
-    get_password_hash,
+    Principal,
+    get_current_principal,
+    get_password_hash_async,
     get_session,
+    get_user_read_session,
+    principal_cache,
+)
+from fastapi_zero.serialization import (
+    json_response,
+    public_columns,
+    rows_to_dicts,
 )
+from fastapi_zero.settings import Settings, get_app_settings
 
 router = APIRouter(prefix='/users', tags=['users'])
+USER_PUBLIC_COLUMNS = public_columns(User, UserPublic)
+# desligado até o lifespan chamar configure_user_cache
+user_cache = TTLCache(maxsize=0, ttl=0)
 
 T_Session = Annotated[AsyncSession, Depends(get_session)]
-T_CurrentUser = Annotated[User, Depends(get_current_user)]
+T_UserReadSession = Annotated[AsyncSession, Depends(get_user_read_session)]
+T_Principal = Annotated[Principal, Depends(get_current_principal)]
+T_Settings = Annotated[Settings, Depends(get_app_settings)]
+
+
+def configure_user_cache(settings: Settings):
+    user_cache.configure(settings.USER_CACHE_SIZE, settings.USER_CACHE_TTL)
+
+
+def user_page_query(filter_users: FilterPage):
+    return paginate(
+        select(*USER_PUBLIC_COLUMNS),
+        User.id,
+        filter_users.after_id,
+        filter_users.limit,
+        filter_users.offset,
+    )
+
+
+def user_query(user_id: int):
+    return select(*USER_PUBLIC_COLUMNS, User.updated_at).where(
+        User.id == user_id
+    )
 
 
 @router.post('/', status_code=HTTPStatus.CREATED, response_model=UserPublic)
@@ -45,34 +90,60 @@ async def create_user(user: UserSchema, session: T_Session):
     db_user = User(
         username=user.username,
         email=user.email,
-        password=get_password_hash(user.password),
+        password=await get_password_hash_async(user.password),
     )
     session.add(db_user)
     await session.commit()
-    await session.refresh(db_user)
     return db_user
 
 
 @router.get('/', status_code=HTTPStatus.OK, response_model=UserList)
 async def read_users(
-    session: T_Session,
-    current_user: T_CurrentUser,
+    session: T_UserReadSession,
+    current_user: T_Principal,
     filter_users: Annotated[FilterPage, Query()],
 ):
-    users = await session.scalars(
-        select(User).limit(filter_users.limit).offset(filter_users.offset)
-    )
-    return {'users': users}
+    users = await session.execute(user_page_query(filter_users))
+    users, next_cursor = next_page(users.all(), filter_users.limit)
+    return json_response({
+        'users': rows_to_dicts(users),
+        'next_cursor': next_cursor,
+    })
 
 
 @router.get('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
-async def read_user(user_id: int, session: T_Session):
-    user_db = await session.scalar(select(User).where(User.id == user_id))
-    if not user_db:
-        raise HTTPException(
-            status_code=HTTPStatus.NOT_FOUND, detail='Usuário não encontrado.'
+async def read_user(
+    user_id: int,
+    session: T_Session,
+    settings: T_Settings,
+    if_none_match: Annotated[str | None, Header()] = None,
+):
+    # guarda os bytes já serializados; update/delete invalidam a entrada.
+    # A falta é lida do primário: uma réplica atrasada gravaria no cache a
+    # versão anterior à escrita que acabou de invalidá-lo
+    cached = user_cache.get(user_id)
+    if cached is None:
+        user_db = (await session.execute(user_query(user_id))).first()
+        if not user_db:
+            raise HTTPException(
+                status_code=HTTPStatus.NOT_FOUND,
+                detail='Usuário não encontrado.',
+            )
+        *public, updated_at = user_db
+        cached = (
+            resource_etag(user_id, updated_at),
+            to_json(dict(zip(UserPublic.model_fields, public))),
         )
-    return UserPublic.model_validate(user_db).model_dump()
+        user_cache.set(user_id, cached)
+
+    etag, body = cached
+    headers = {
+        'ETag': etag,
+        'Cache-Control': f'public, max-age={settings.USER_CACHE_MAX_AGE}',
+    }
+    if matched := none_match(if_none_match, etag):
+        return not_modified(matched, headers)
+    return Response(body, media_type='application/json', headers=headers)
 
 
 @router.put('/{user_id}', status_code=HTTPStatus.OK, response_model=UserPublic)
@@ -80,39 +151,54 @@ async def update_user(
     user_id: int,
     user: UserSchema,
     session: T_Session,
-    current_user: T_CurrentUser,
+    current_user: T_Principal,
 ):
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Sem permissão.'
         )
+    query = (
+        update(User)
+        .where(User.id == current_user.id)
+        .values(
+            username=user.username,
+            email=str(user.email),
+            password=await get_password_hash_async(user.password),
+            # a senha foi trocada: os tokens emitidos antes deixam de valer
+            token_version=User.token_version + 1,
+            updated_at=func.now(),
+        )
+        .returning(User)
+    )
     try:
-        current_user.username = user.username
-        current_user.email = str(user.email)
-        current_user.password = get_password_hash(user.password)
-
-        session.add(current_user)
+        user_db = await session.scalar(query)
         await session.commit()
-        await session.refresh(current_user)
-        return current_user
     except IntegrityError:
+        await session.rollback()
         raise HTTPException(
             status_code=HTTPStatus.CONFLICT,
             detail='Usuário ou email já existe.',
         )
 
+    principal_cache.pop(current_user.id)
+    user_cache.pop(current_user.id)
+    return user_db
+
 
 @router.delete('/{user_id}', status_code=HTTPStatus.OK, response_model=Message)
 async def delete_user(
     user_id: int,
     session: T_Session,
-    current_user: T_CurrentUser,
+    current_user: T_Principal,
 ):
     if current_user.id != user_id:
         raise HTTPException(
             status_code=HTTPStatus.FORBIDDEN, detail='Sem permissão.'
         )
-    await session.delete(current_user)
+    # as tasks do usuário saem pelo ON DELETE CASCADE do banco
+    await session.execute(delete(User).where(User.id == current_user.id))
     await session.commit()
+    principal_cache.pop(current_user.id)
+    user_cache.pop(current_user.id)
 
     return Message(message='Usuário deletado.')
@@ -1,8 +1,10 @@
 from datetime import datetime
+from typing import Literal
 
-from pydantic import BaseModel, ConfigDict, EmailStr, Field
+from pydantic import BaseModel, ConfigDict, EmailStr, Field, field_validator
 
 from fastapi_zero.models import TodoState
+from fastapi_zero.pagination import decode_cursor
 
 
 class Message(BaseModel):
@@ -26,6 +28,7 @@ class UserPublic(BaseModel):
 
 class UserList(BaseModel):
     users: list[UserPublic]
+    next_cursor: str | None = None
 
 
 class Token(BaseModel):
@@ -36,14 +39,35 @@ class Token(BaseModel):
 class FilterPage(BaseModel):
     limit: int = Field(ge=0, default=10)
     offset: int = Field(ge=0, default=0)
+    # cursor opaco devolvido em next_cursor pela página anterior
+    cursor: str | None = None
 
+    @field_validator('cursor')
+    @classmethod
+    def validate_cursor(cls, cursor: str | None):
+        if cursor is not None:
+            decode_cursor(cursor)
+        return cursor
 
-class FilterTodo(FilterPage):
+    @property
+    def after_id(self) -> int | None:
+        return decode_cursor(self.cursor) if self.cursor else None
+
+
+class FilterTodoFields(BaseModel):
     title: str | None = Field(default=None, min_length=3)
     description: str | None = None
     state: TodoState | None = None
 
 
+class FilterTodo(FilterPage, FilterTodoFields):
+    pass
+
+
+class FilterTodoExport(FilterTodoFields):
+    format: Literal['ndjson', 'csv'] = 'ndjson'
+
+
 class TodoSchema(BaseModel):
     title: str
     description: str
@@ -58,9 +82,61 @@ class TodoPublic(TodoSchema):
 
 class TodoList(BaseModel):
     todos: list[TodoPublic]
+    next_cursor: str | None = None
+
+
+class TodoStats(BaseModel):
+    total: int
+    states: dict[TodoState, int]
 
 
 class TodoUpdate(BaseModel):
     title: str | None = None
     description: str | None = None
     state: TodoState | None = None
+
+
+class CacheStats(BaseModel):
+    size: int
+    maxsize: int
+    hits: int
+    misses: int
+    evictions: int
+    expirations: int
+
+
+class HistogramSnapshot(BaseModel):
+    buckets: dict[str, int]
+    sum: float
+    count: int
+
+
+class PoolStats(BaseModel):
+    size: int
+    checked_in: int
+    checked_out: int
+    overflow: int
+    connects: int
+    timeouts: int
+    checkout_seconds: HistogramSnapshot
+
+
+class InternalStats(BaseModel):
+    principal_cache: CacheStats
+    user_cache: CacheStats
+    pool: PoolStats
+
+
+class TodoBatchUpdate(TodoUpdate):
+    id: int
+
+
+class TodoBatchResult(BaseModel):
+    id: int
+    status: int
+    todo: TodoPublic | None = None
+    detail: str | None = None
+
+
+class TodoBatchResponse(BaseModel):
+    results: list[TodoBatchResult]
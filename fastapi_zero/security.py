@@ -1,21 +1,111 @@
+import asyncio
+import secrets
+from concurrent.futures import (
+    Executor,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+)
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from http import HTTPStatus
 from zoneinfo import ZoneInfo
 
-from fastapi import Depends, HTTPException
-from fastapi.security import OAuth2PasswordBearer
-from jwt import DecodeError, decode, encode
+from fastapi import Depends, HTTPException, Request
+from fastapi.security import (
+    HTTPAuthorizationCredentials,
+    HTTPBearer,
+    OAuth2PasswordBearer,
+)
+from jwt import InvalidTokenError, decode, encode
 from pwdlib import PasswordHash
 from sqlalchemy import select
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi_zero.database import get_session
+from fastapi_zero.cache import TTLCache
+from fastapi_zero.database import db, get_session
 from fastapi_zero.models import User
-from fastapi_zero.settings import Settings
+from fastapi_zero.settings import Settings, get_app_settings, get_settings
 
 pwd_context = PasswordHash.recommended()
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl='auth/token')
-settings = Settings()
+internal_scheme = HTTPBearer(auto_error=False)
+SAFE_METHODS = {'GET', 'HEAD', 'OPTIONS'}
+
+
+@dataclass(frozen=True, slots=True)
+class Principal:
+    # usuário autenticado, sem carregar a entidade ORM completa
+    id: int
+    username: str
+    email: str
+    token_version: int
+
+
+class HashPool:
+    # executa o argon2 num pool com fila limitada, para não travar o loop
+    def __init__(self, kind: str, size: int, queue_depth: int):
+        self.pending = 0
+        self._executor: Executor | None = None
+        self.configure(kind, size, queue_depth)
+
+    def configure(self, kind: str, size: int, queue_depth: int):
+        # o executor antigo termina o que já recebeu; o próximo run cria outro
+        self.shutdown()
+        self.kind = kind
+        self.size = size
+        self.queue_depth = queue_depth
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == 'process':
+                self._executor = ProcessPoolExecutor(max_workers=self.size)
+            else:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.size, thread_name_prefix='hash'
+                )
+        return self._executor
+
+    async def run(self, func, *args):
+        if self.size == 0:
+            return func(*args)
+
+        if self.pending >= self.size + self.queue_depth:
+            raise HTTPException(
+                status_code=HTTPStatus.SERVICE_UNAVAILABLE,
+                detail='Servidor ocupado, tente novamente.',
+                headers={'Retry-After': '1'},
+            )
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), func, *args
+            )
+        finally:
+            self.pending -= 1
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# montados vazios no import (hash no próprio loop, cache desligado) e
+# configurados no lifespan com as settings do create_app
+hash_pool = HashPool('thread', 0, 0)
+principal_cache = TTLCache(maxsize=0, ttl=0)
+
+
+def configure_security(settings: Settings):
+    hash_pool.configure(
+        settings.HASH_POOL_KIND,
+        settings.HASH_POOL_SIZE,
+        settings.HASH_QUEUE_DEPTH,
+    )
+    principal_cache.configure(
+        settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL
+    )
 
 
 def get_password_hash(password: str):
@@ -26,7 +116,18 @@ def verify_password(plain_password: str, hashed_password: str):
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(data: dict):
+async def get_password_hash_async(password: str):
+    return await hash_pool.run(get_password_hash, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str):
+    return await hash_pool.run(
+        verify_password, plain_password, hashed_password
+    )
+
+
+def create_access_token(data: dict, settings: Settings | None = None):
+    settings = settings or get_settings()
     to_encode = data.copy()
 
     expire = datetime.now(tz=ZoneInfo('UTC')) + timedelta(
@@ -40,28 +141,95 @@ def create_access_token(data: dict):
     return encoded_jwt
 
 
-async def get_current_user(
-    session: AsyncSession = Depends(get_session),
-    token: str = Depends(oauth2_scheme),
-):
-    credentials_exception = HTTPException(
-        status_code=HTTPStatus.UNAUTHORIZED,
-        detail='Não foi possível validar as credenciais.',
-        headers={'WWW-Authenticate': 'Bearer'},
+credentials_exception = HTTPException(
+    status_code=HTTPStatus.UNAUTHORIZED,
+    detail='Não foi possível validar as credenciais.',
+    headers={'WWW-Authenticate': 'Bearer'},
+)
+
+
+def create_user_token(user: User, settings: Settings | None = None):
+    # o id e a versão do token permitem validar sem buscar pelo email
+    return create_access_token(
+        {'sub': user.email, 'uid': user.id, 'ver': user.token_version},
+        settings,
     )
 
+
+def get_token_claims(token: str, settings: Settings) -> tuple[int, int]:
     try:
         payload = decode(
             token, settings.SECRET_KEY, algorithms=settings.ALGORITHM
         )
-        subject_email = payload.get('sub')
-        if not subject_email:
-            raise credentials_exception
-    except DecodeError:
+    except InvalidTokenError:
         raise credentials_exception
-    user_db = await session.scalar(
-        select(User).where(User.email == subject_email)
-    )
-    if not user_db:
+    user_id = payload.get('uid')
+    version = payload.get('ver')
+    if not isinstance(user_id, int) or not isinstance(version, int):
         raise credentials_exception
-    return user_db
+    return user_id, version
+
+
+def pin_writer(request: Request, user_id: int):
+    # requisições que podem escrever prendem o usuário ao primário
+    if request.method not in SAFE_METHODS:
+        db.replicas.pin(user_id)
+
+
+async def verify_internal_token(
+    credentials: HTTPAuthorizationCredentials | None = Depends(
+        internal_scheme
+    ),
+    settings: Settings = Depends(get_app_settings),
+):
+    # métricas e estatísticas internas ficam fora do acesso público
+    if not settings.INTERNAL_TOKEN:
+        raise HTTPException(
+            status_code=HTTPStatus.NOT_FOUND, detail='Not Found'
+        )
+    if credentials is None or not secrets.compare_digest(
+        credentials.credentials.encode(), settings.INTERNAL_TOKEN.encode()
+    ):
+        raise HTTPException(
+            status_code=HTTPStatus.UNAUTHORIZED,
+            detail='Não foi possível validar as credenciais.',
+            headers={'WWW-Authenticate': 'Bearer'},
+        )
+
+
+def principal_query(user_id: int):
+    return select(
+        User.id, User.username, User.email, User.token_version
+    ).where(User.id == user_id)
+
+
+async def get_current_principal(
+    request: Request,
+    session: AsyncSession = Depends(get_session),
+    token: str = Depends(oauth2_scheme),
+    settings: Settings = Depends(get_app_settings),
+) -> Principal:
+    # com o cache quente não vai ao banco: só confere a versão do token
+    user_id, version = get_token_claims(token, settings)
+    pin_writer(request, user_id)
+    principal = principal_cache.get(user_id)
+    if not principal:
+        row = (await session.execute(principal_query(user_id))).first()
+        if not row:
+            raise credentials_exception
+        principal = Principal(*row)
+        principal_cache.set(user_id, principal)
+
+    if principal.token_version != version:
+        raise credentials_exception
+    return principal
+
+
+async def get_user_read_session(
+    principal: Principal = Depends(get_current_principal),
+):  # pragma: no cover
+    # réplica para leituras autenticadas, salvo se o usuário escreveu há pouco
+    async with AsyncSession(
+        db.replicas.engine_for(principal.id), expire_on_commit=False
+    ) as session:
+        yield session
@@ -0,0 +1,40 @@
+from http import HTTPStatus
+
+from fastapi import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+from sqlalchemy import Enum, String, type_coerce
+
+
+def public_columns(model, schema: type[BaseModel]) -> list:
+    # só as colunas que o schema público expõe, na ordem dos campos
+    columns = []
+    for name in schema.model_fields:
+        column = getattr(model, name)
+        if isinstance(column.type, Enum):
+            # o texto cru do banco já é o valor do JSON: evita converter
+            # para o Enum do Python e de volta para texto
+            column = type_coerce(column, String).label(name)
+        columns.append(column)
+    return columns
+
+
+def rows_to_dicts(rows) -> list[dict]:
+    # zip com os nomes das colunas é bem mais barato que Row._asdict()
+    if not rows:
+        return []
+    keys = rows[0]._fields
+    return [dict(zip(keys, row)) for row in rows]
+
+
+def json_response(
+    content, status_code: int = HTTPStatus.OK, headers: dict | None = None
+) -> Response:
+    # as linhas já vêm no formato do response_model: serializa direto em
+    # bytes, sem montar e validar um modelo pydantic por linha
+    return Response(
+        to_json(content),
+        status_code=status_code,
+        media_type='application/json',
+        headers=headers,
+    )
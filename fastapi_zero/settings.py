@@ -1,3 +1,8 @@
+from functools import lru_cache
+from typing import Literal
+
+from fastapi import Request
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -9,3 +14,97 @@ class Settings(BaseSettings):
     SECRET_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
+
+    # pool que roda o argon2 fora do event loop (0 = no próprio loop)
+    HASH_POOL_KIND: Literal['thread', 'process'] = 'thread'
+    HASH_POOL_SIZE: int = 4
+    HASH_QUEUE_DEPTH: int = 64
+
+    # cache dos usuários autenticados (ttl em segundos, tamanho 0 desliga)
+    PRINCIPAL_CACHE_SIZE: int = 1024
+    PRINCIPAL_CACHE_TTL: float = 60
+
+    # máximo de itens por requisição nos endpoints /todos/batch
+    TODO_BATCH_MAX_SIZE: int = 500
+
+    # linhas lidas do cursor do banco por vez no GET /todos/export
+    TODO_EXPORT_CHUNK_SIZE: int = 1000
+
+    # POST /todos/import: linhas validadas e copiadas por bloco, quantos
+    # erros por linha são devolvidos no resumo e o tamanho máximo do corpo
+    TODO_IMPORT_CHUNK_SIZE: int = 5000
+    TODO_IMPORT_MAX_ERRORS: int = 100
+    TODO_IMPORT_MAX_BYTES: int = 50 * 1024 * 1024
+
+    # pool de conexões do engine (DATABASE_POOL_RECYCLE -1 = nunca recicla)
+    DATABASE_POOL_SIZE: int = 5
+    DATABASE_MAX_OVERFLOW: int = 10
+    DATABASE_POOL_TIMEOUT: float = 30
+    DATABASE_POOL_RECYCLE: int = -1
+    DATABASE_POOL_PRE_PING: bool = False
+    # execuções até o psycopg preparar a consulta (None = nunca prepara)
+    DATABASE_PREPARE_THRESHOLD: int | None = 5
+
+    # réplicas de leitura; vazio = tudo vai para o primário. Depois de uma
+    # escrita o usuário lê do primário por DATABASE_READ_YOUR_WRITES_SECONDS
+    DATABASE_REPLICA_URLS: list[str] = []
+    DATABASE_READ_YOUR_WRITES_SECONDS: float = 5
+    DATABASE_READ_YOUR_WRITES_SIZE: int = 10000
+
+    # X-DB-Queries/X-DB-Time nas respostas e aviso de N+1 quando o mesmo SQL
+    # roda DB_N_PLUS_ONE_THRESHOLD vezes numa requisição (0 desliga)
+    DB_QUERY_HEADERS: bool = False
+    DB_N_PLUS_ONE_THRESHOLD: int = 10
+
+    # compressão das respostas; br e zstd só entram com os pacotes brotli e
+    # zstandard instalados
+    COMPRESSION_MIN_SIZE: int = 1024
+    COMPRESSION_ENCODINGS: list[str] = ['zstd', 'br', 'gzip']
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_LEVEL: int = 4
+    COMPRESSION_ZSTD_LEVEL: int = 3
+
+    # cache de GET /users/{user_id} por processo; USER_CACHE_MAX_AGE vai no
+    # Cache-Control para proxies e CDNs
+    USER_CACHE_SIZE: int = 4096
+    USER_CACHE_TTL: float = 30
+    USER_CACHE_MAX_AGE: int = 30
+
+    # aquecimento no lifespan: abre WARMUP_CONNECTIONS conexões, executa as
+    # consultas das rotas, um hash e um JWT; /health/ready só responde 200
+    # depois dele
+    WARMUP_ENABLED: bool = False
+    WARMUP_CONNECTIONS: int = 5
+
+    # token bucket do POST /auth/token por IP e por conta: BURST tentativas
+    # seguidas e depois PER_MINUTE por minuto (BURST 0 desliga o limite;
+    # PER_MINUTE 0 travaria o bucket vazio para sempre)
+    LOGIN_IP_BURST: int = 20
+    LOGIN_IP_PER_MINUTE: float = Field(10, gt=0)
+    LOGIN_ACCOUNT_BURST: int = 5
+    LOGIN_ACCOUNT_PER_MINUTE: float = Field(5, gt=0)
+    LOGIN_THROTTLE_SIZE: int = 100_000
+
+    # requisições simultâneas por grupo de rotas (0 = sem limite); as
+    # excedentes esperam numa fila de até ADMISSION_QUEUE_SIZE por no máximo
+    # ADMISSION_QUEUE_TIMEOUT segundos e depois recebem 503
+    ADMISSION_LIMITS: dict[str, int] = {'auth': 10, 'users': 20, 'todos': 20}
+    ADMISSION_QUEUE_SIZE: int = 100
+    ADMISSION_QUEUE_TIMEOUT: float = 1
+    ADMISSION_RETRY_AFTER: int = 1
+
+    # /metrics e /internal/* exigem Authorization: Bearer INTERNAL_TOKEN;
+    # sem token configurado respondem 404
+    INTERNAL_TOKEN: str | None = None
+
+
+@lru_cache
+def get_settings() -> Settings:
+    # lê o ambiente e o .env uma vez só por processo
+    return Settings()
+
+
+async def get_app_settings(request: Request) -> Settings:
+    # a configuração passada para o create_app que atende a requisição; um
+    # app montado sem o create_app usa a do ambiente
+    return getattr(request.app.state, 'settings', None) or get_settings()
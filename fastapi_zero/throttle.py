@@ -0,0 +1,65 @@
+import math
+import time
+from collections import OrderedDict
+
+from fastapi_zero.metrics import registry
+
+throttled_total = registry.counter(
+    'auth_throttled_total',
+    'Tentativas de login recusadas pelo limite de taxa.',
+    ('scope',),
+)
+
+
+class MemoryBackend:
+    # buckets no próprio processo: com vários workers cada um tem o seu.
+    # Um backend compartilhado (Redis etc.) só precisa oferecer o mesmo
+    # take(), aplicando o desconto de forma atômica
+    def __init__(self, maxsize: int):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+
+    async def take(self, key, capacity: int, rate: float) -> float:
+        # consome um token e devolve 0, ou os segundos até haver um
+        now = time.monotonic()
+        tokens, updated = self._buckets.pop(key, (capacity, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        wait = 0.0
+        if tokens >= 1:
+            tokens -= 1
+        else:
+            wait = (1 - tokens) / rate
+        self._buckets[key] = (tokens, now)
+        # o menos usado sai primeiro; um bucket esquecido volta cheio, o
+        # que só é generoso com quem ficou parado
+        while len(self._buckets) > self.maxsize:
+            self._buckets.popitem(last=False)
+        return wait
+
+    def clear(self):
+        self._buckets.clear()
+
+
+class Throttle:
+    def __init__(self, backend, limits: dict[str, tuple[int, float]]):
+        # limits: escopo -> (capacidade, tokens por segundo)
+        self.backend = backend
+        self.configure(limits)
+
+    def configure(self, limits: dict[str, tuple[int, float]]):
+        self.limits = {
+            scope: limit for scope, limit in limits.items() if limit[0] > 0
+        }
+
+    async def check(self, **keys) -> int:
+        # segundos de Retry-After (0 = liberado); o primeiro escopo sem
+        # token já recusa, sem gastar os buckets seguintes
+        for scope, key in keys.items():
+            if scope not in self.limits:
+                continue
+            capacity, rate = self.limits[scope]
+            wait = await self.backend.take((scope, key), capacity, rate)
+            if wait:
+                throttled_total.inc(scope)
+                return math.ceil(wait)
+        return 0
@@ -0,0 +1,89 @@
+import asyncio
+import logging
+import time
+
+from jwt import decode
+
+from fastapi_zero.metrics import registry
+from fastapi_zero.routers.todos import todo_etag_query, todo_page_query
+from fastapi_zero.routers.users import user_page_query, user_query
+from fastapi_zero.schemas import FilterPage, FilterTodo
+from fastapi_zero.security import (
+    create_access_token,
+    get_password_hash_async,
+    principal_query,
+    verify_password_async,
+)
+from fastapi_zero.settings import Settings
+
+logger = logging.getLogger(__name__)
+
+warmup_seconds = registry.gauge(
+    'app_warmup_seconds', 'Duração de cada etapa do aquecimento.', ('step',)
+)
+
+
+def hot_queries() -> list:
+    # as mesmas funções que as rotas usam: o SQL tem a mesma estrutura e o
+    # cache de compilação do SQLAlchemy já sai preenchido
+    todo_filter = FilterTodo()
+    return [
+        principal_query(0),
+        todo_etag_query(0, todo_filter),
+        todo_page_query(0, todo_filter),
+        user_page_query(FilterPage()),
+        user_query(0),
+    ]
+
+
+async def warm_connection(engine, queries: list, repeat: int):
+    async with engine.connect() as conn:
+        # o psycopg só prepara a consulta depois de prepare_threshold
+        # execuções na mesma conexão
+        for _ in range(repeat):
+            for query in queries:
+                await conn.execute(query)
+        await conn.rollback()
+
+
+async def warm_database(engine, settings: Settings):
+    # conexões abertas ao mesmo tempo, para o pool ficar com todas elas
+    repeat = (settings.DATABASE_PREPARE_THRESHOLD or 0) + 1
+    queries = hot_queries()
+    await asyncio.gather(
+        *(
+            warm_connection(engine, queries, repeat)
+            for _ in range(settings.WARMUP_CONNECTIONS)
+        )
+    )
+
+
+async def warm_security(settings: Settings):
+    # sobe o pool do argon2 e monta os parâmetros do hash e do JWT
+    hashed = await get_password_hash_async('warmup')
+    await verify_password_async('warmup', hashed)
+    token = create_access_token({'sub': 'warmup'}, settings)
+    decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+
+
+async def warm_schemas(app):
+    # o schema OpenAPI é montado preguiçosamente na primeira chamada
+    app.openapi()
+
+
+async def run_warmup(app, engine, settings: Settings):
+    steps = {
+        'database': lambda: warm_database(engine, settings),
+        'security': lambda: warm_security(settings),
+        'schemas': lambda: warm_schemas(app),
+    }
+    try:
+        for name, step in steps.items():
+            start = time.perf_counter()
+            await step()
+            warmup_seconds.set(name, value=time.perf_counter() - start)
+    except Exception:
+        # o aquecimento só adianta trabalho: se falhar, o app atende frio
+        logger.exception('Falha no aquecimento')
+    finally:
+        app.state.ready = True
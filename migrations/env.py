@@ -6,12 +6,12 @@ from sqlalchemy import engine_from_config
 from sqlalchemy import pool
 
 from alembic import context
-from fastapi_zero.settings import Settings
+from fastapi_zero.settings import get_settings
 from fastapi_zero.models import table_registry
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
-config.set_main_option('sqlalchemy.url', Settings().DATABASE_URL)
+config.set_main_option('sqlalchemy.url', get_settings().DATABASE_URL)
 
 
 # Interpret the config file for Python logging.
@@ -0,0 +1,42 @@
+"""indices de todos cobrem o etag
+
+Revision ID: 0c4e8a27b91d
+Revises: f2b7c0d9e418
+Create Date: 2026-10-18 18:02:47.310562
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0c4e8a27b91d'
+down_revision: Union[str, Sequence[str], None] = 'f2b7c0d9e418'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### comandos ajustados manualmente ###
+    op.drop_index('ix_todos_user_id_state_id', table_name='todos')
+    op.drop_index('ix_todos_user_id_id', table_name='todos')
+    op.create_index(
+        'ix_todos_user_id_id', 'todos', ['user_id', 'id'], unique=False,
+        postgresql_include=['updated_at', 'state']
+    )
+    op.create_index(
+        'ix_todos_user_id_state_id', 'todos', ['user_id', 'state', 'id'],
+        unique=False, postgresql_include=['updated_at']
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### comandos ajustados manualmente ###
+    op.drop_index('ix_todos_user_id_state_id', table_name='todos')
+    op.drop_index('ix_todos_user_id_id', table_name='todos')
+    op.create_index('ix_todos_user_id_id', 'todos', ['user_id', 'id'], unique=False)
+    op.create_index('ix_todos_user_id_state_id', 'todos', ['user_id', 'state', 'id'], unique=False)
@@ -0,0 +1,39 @@
+"""cascade delete todos do usuario
+
+Revision ID: 4b1f0d2e9a7c
+Revises: e6c42b667457
+Create Date: 2026-10-18 10:02:11.512930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4b1f0d2e9a7c'
+down_revision: Union[str, Sequence[str], None] = 'e6c42b667457'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### comandos ajustados manualmente ###
+    # o relacionamento User.todos não é mais carregado junto do usuário,
+    # então a remoção em cascata das tasks fica a cargo do banco
+    op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+    op.create_foreign_key(
+        'todos_user_id_fkey', 'todos', 'users',
+        ['user_id'], ['id'], ondelete='CASCADE'
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### comandos ajustados manualmente ###
+    op.drop_constraint('todos_user_id_fkey', 'todos', type_='foreignkey')
+    op.create_foreign_key(
+        'todos_user_id_fkey', 'todos', 'users', ['user_id'], ['id']
+    )
@@ -0,0 +1,48 @@
+"""indices trigram de title e description
+
+Revision ID: a93e57c1d4f8
+Revises: 8d2c4a61f0b3
+Create Date: 2026-10-18 12:41:05.673311
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a93e57c1d4f8'
+down_revision: Union[str, Sequence[str], None] = '8d2c4a61f0b3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### comandos ajustados manualmente ###
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    op.create_index(
+        'ix_todos_title_trgm', 'todos', ['title'], unique=False,
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+    )
+    op.create_index(
+        'ix_todos_description_trgm', 'todos', ['description'], unique=False,
+        postgresql_using='gin',
+        postgresql_ops={'description': 'gin_trgm_ops'}
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### comandos ajustados manualmente ###
+    # a extensão pg_trgm fica, outros objetos do banco podem usá-la
+    op.drop_index(
+        'ix_todos_description_trgm', table_name='todos',
+        postgresql_using='gin',
+        postgresql_ops={'description': 'gin_trgm_ops'}
+    )
+    op.drop_index(
+        'ix_todos_title_trgm', table_name='todos',
+        postgresql_using='gin', postgresql_ops={'title': 'gin_trgm_ops'}
+    )
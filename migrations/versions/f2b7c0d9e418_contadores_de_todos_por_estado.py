@@ -0,0 +1,109 @@
+"""contadores de todos por estado
+
+Revision ID: f2b7c0d9e418
+Revises: b5d81f3e6c20
+Create Date: 2026-10-18 16:20:11.512930
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f2b7c0d9e418'
+down_revision: Union[str, Sequence[str], None] = 'b5d81f3e6c20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# cópia do SQL desta revisão: mudanças futuras em models.py não podem
+# alterar o que esta migração cria
+TODO_COUNTERS_FUNCTION = """
+CREATE OR REPLACE FUNCTION todo_counters_apply() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        INSERT INTO todo_counters (user_id, state, count)
+        SELECT user_id, state, count(*) FROM new_rows
+        GROUP BY user_id, state ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_counters.count + EXCLUDED.count;
+        RETURN NULL;
+    END IF;
+
+    IF TG_OP = 'DELETE' THEN
+        INSERT INTO todo_counters (user_id, state, count)
+        SELECT user_id, state, -count(*) FROM old_rows
+        GROUP BY user_id, state ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_counters.count + EXCLUDED.count;
+    ELSE
+        INSERT INTO todo_counters (user_id, state, count)
+        SELECT user_id, state, sum(delta) FROM (
+            SELECT user_id, state, 1 AS delta FROM new_rows
+            UNION ALL
+            SELECT user_id, state, -1 FROM old_rows
+        ) AS changes
+        GROUP BY user_id, state HAVING sum(delta) <> 0
+        ORDER BY user_id, state
+        ON CONFLICT (user_id, state)
+        DO UPDATE SET count = todo_counters.count + EXCLUDED.count;
+    END IF;
+
+    DELETE FROM todo_counters
+    WHERE count = 0 AND user_id IN (SELECT user_id FROM old_rows);
+    RETURN NULL;
+END;
+$$
+"""
+TODO_COUNTERS_TRIGGERS = (
+    """
+    CREATE TRIGGER todo_counters_insert AFTER INSERT ON todos
+    REFERENCING NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_apply()
+    """,
+    """
+    CREATE TRIGGER todo_counters_update AFTER UPDATE ON todos
+    REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_apply()
+    """,
+    """
+    CREATE TRIGGER todo_counters_delete AFTER DELETE ON todos
+    REFERENCING OLD TABLE AS old_rows
+    FOR EACH STATEMENT EXECUTE FUNCTION todo_counters_apply()
+    """,
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # ### comandos ajustados manualmente ###
+    op.create_table('todo_counters',
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('state', postgresql.ENUM(name='todostate', create_type=False), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('user_id', 'state')
+    )
+    # trava as escritas em todos enquanto preenche e cria os triggers, para
+    # nenhuma alteração ficar de fora da contagem inicial
+    op.execute('LOCK TABLE todos IN SHARE MODE')
+    op.execute(
+        'INSERT INTO todo_counters (user_id, state, count) '
+        'SELECT user_id, state, count(*) FROM todos GROUP BY user_id, state'
+    )
+    op.execute(TODO_COUNTERS_FUNCTION)
+    for trigger in TODO_COUNTERS_TRIGGERS:
+        op.execute(trigger)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # ### comandos ajustados manualmente ###
+    op.execute('DROP TRIGGER todo_counters_delete ON todos')
+    op.execute('DROP TRIGGER todo_counters_update ON todos')
+    op.execute('DROP TRIGGER todo_counters_insert ON todos')
+    op.execute('DROP FUNCTION todo_counters_apply()')
+    op.drop_table('todo_counters')
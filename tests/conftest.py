@@ -6,31 +6,59 @@ import pytest
 import pytest_asyncio
 from fastapi.testclient import TestClient
 from sqlalchemy import event
-from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.ext.asyncio import AsyncSession
 from testcontainers.postgres import PostgresContainer
 
-from fastapi_zero.app import app
-from fastapi_zero.database import get_session
+from fastapi_zero.app import create_app
+from fastapi_zero.database import create_engine, get_session
 from fastapi_zero.models import Todo, TodoState, User, table_registry
-from fastapi_zero.security import get_password_hash
-from fastapi_zero.settings import Settings
+from fastapi_zero.routers.auth import login_throttle
+from fastapi_zero.routers.users import user_cache
+from fastapi_zero.security import (
+    get_password_hash,
+    get_user_read_session,
+    principal_cache,
+)
+from fastapi_zero.settings import get_settings
+
+INTERNAL_TOKEN = 'internal-test-token'
+
+
+@pytest.fixture
+def app():
+    return create_app(
+        get_settings().model_copy(update={'INTERNAL_TOKEN': INTERNAL_TOKEN})
+    )
+
+
+@pytest.fixture
+def internal_headers():
+    return {'Authorization': f'Bearer {INTERNAL_TOKEN}'}
 
 
 @pytest.fixture
-def client(session):
+def client(app, session):
     def get_session_override():
         return session
 
     with TestClient(app) as client:
         app.dependency_overrides[get_session] = get_session_override
+        app.dependency_overrides[get_user_read_session] = get_session_override
         yield client
-    app.dependency_overrides.clear()
+
+
+@pytest.fixture(autouse=True)
+def clear_caches():
+    yield
+    principal_cache.clear()
+    user_cache.clear()
+    login_throttle.backend.clear()
 
 
 @pytest.fixture(scope='session')
 def engine():
     with PostgresContainer('postgres:17', driver='psycopg') as postgres:
-        yield create_async_engine(postgres.get_connection_url())
+        yield create_engine(get_settings(), postgres.get_connection_url())
 
 
 @pytest_asyncio.fixture
@@ -69,6 +97,43 @@ def mock_db_time():
     return _mock_db_time
 
 
+@contextmanager
+def _count_queries(engine):
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, *args):
+        statements.append((statement, parameters))
+
+    event.listen(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+    yield statements
+    event.remove(
+        engine.sync_engine, 'before_cursor_execute', before_cursor_execute
+    )
+
+
+@pytest.fixture
+def count_queries(engine):
+    return lambda: _count_queries(engine)
+
+
+@contextmanager
+def _assert_max_queries(engine, maximum):
+    with _count_queries(engine) as statements:
+        yield statements
+    executed = '\n'.join(statement for statement, _ in statements)
+    assert len(statements) <= maximum, (
+        f'{len(statements)} consultas, máximo {maximum}:\n{executed}'
+    )
+
+
+@pytest.fixture
+def assert_max_queries(engine):
+    # uso: with assert_max_queries(2): client.get(...)
+    return lambda maximum: _assert_max_queries(engine, maximum)
+
+
 @pytest_asyncio.fixture
 async def user(session: AsyncSession):
     password = 'secret'
@@ -102,7 +167,7 @@ def token(client, user):
 
 @pytest.fixture
 def settings():
-    return Settings()
+    return get_settings()
 
 
 @pytest_asyncio.fixture
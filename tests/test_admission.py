@@ -0,0 +1,89 @@
+import asyncio
+from http import HTTPStatus
+
+import httpx
+import pytest
+
+from fastapi_zero.admission import (
+    AdmissionMiddleware,
+    Limiter,
+    admission_rejected,
+    route_group,
+)
+from fastapi_zero.middleware import MetricsMiddleware, http_requests
+
+
+def test_route_group():
+    assert route_group('/todos/') == 'todos'
+    assert route_group('/todos/1') == 'todos'
+    assert route_group('/auth/token') == 'auth'
+    assert route_group('/todosx') is None
+    assert route_group('/health/ready') is None
+
+
+@pytest.mark.asyncio
+async def test_limiter_hands_slot_to_waiter():
+    limiter = Limiter('test', limit=1, queue_size=1, timeout=1)
+    assert await limiter.acquire() is None
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    limiter.release()
+
+    assert await waiter is None
+    assert limiter.in_flight == 1
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_rejects():
+    limiter = Limiter('test', limit=1, queue_size=1, timeout=0.01)
+    await limiter.acquire()
+
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+
+    assert await limiter.acquire() == 'queue_full'
+    assert await waiter == 'deadline'
+    limiter.release()
+    assert limiter.in_flight == 0
+
+
+@pytest.mark.asyncio
+async def test_admission_middleware_sheds_after_deadline():
+    unblock = asyncio.Event()
+
+    async def slow_app(scope, receive, send):
+        await unblock.wait()
+        await send({'type': 'http.response.start', 'status': 200})
+        await send({'type': 'http.response.body', 'body': b'ok'})
+
+    app = MetricsMiddleware(
+        AdmissionMiddleware(
+            slow_app, {'todos': 1}, queue_size=5, timeout=0.01, retry_after=2
+        )
+    )
+    before = admission_rejected.value('todos', 'deadline')
+    requests_before = http_requests.value('GET', '<rejected:todos>', '503')
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(
+        transport=transport, base_url='http://test'
+    ) as client:
+        first = asyncio.create_task(client.get('/todos/'))
+        await asyncio.sleep(0.01)
+
+        shed = await client.get('/todos/')
+        unblock.set()
+        untouched = await client.get('/health/live')
+
+        assert (await first).status_code == HTTPStatus.OK
+
+    assert shed.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert shed.headers['Retry-After'] == '2'
+    assert untouched.status_code == HTTPStatus.OK
+    assert admission_rejected.value('todos', 'deadline') == before + 1
+    assert (
+        http_requests.value('GET', '<rejected:todos>', '503')
+        == requests_before + 1
+    )
@@ -1,5 +1,23 @@
+import importlib
+import os
+import subprocess
+import sys
 from http import HTTPStatus
 
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from fastapi_zero.app import create_app
+from fastapi_zero.database import Database, get_session
+from fastapi_zero.middleware import QueryStatsMiddleware
+from fastapi_zero.queries import QueryStats, instrument, track_queries
+from fastapi_zero.routers import auth, users
+from fastapi_zero.security import hash_pool, principal_cache
+from fastapi_zero.settings import get_settings
+
 
 def test_root(client):
     response = client.get('/')
@@ -27,3 +45,149 @@ def test_hello_http(client):
 """
     )
     assert response.status_code == HTTPStatus.OK
+
+
+def test_metrics_use_route_template(client, token, internal_headers):
+    client.delete('/todos/999', headers={'Authorization': f'Bearer {token}'})
+
+    response = client.get('/metrics', headers=internal_headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/plain')
+    assert (
+        'http_requests_total{method="DELETE",route="/todos/{todo_id}",'
+        'status="404"}'
+    ) in response.text
+    assert '/todos/999' not in response.text
+    assert 'db_pool_connections{state="checked_out"}' in response.text
+
+
+def test_metrics_unmatched_route(client, internal_headers):
+    client.get('/nao-existe')
+
+    response = client.get('/metrics', headers=internal_headers)
+
+    assert 'route="<unmatched>",status="404"' in response.text
+
+
+@pytest.mark.parametrize('url', ['/metrics', '/internal/stats'])
+def test_internal_endpoints_require_token(client, url):
+    response = client.get(url, headers={'Authorization': 'Bearer errado'})
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert client.get(url).status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.parametrize('url', ['/metrics', '/internal/stats'])
+def test_internal_endpoints_disabled_without_token(url):
+    settings = get_settings().model_copy(update={'INTERNAL_TOKEN': None})
+
+    with TestClient(create_app(settings)) as client:
+        response = client.get(url, headers={'Authorization': 'Bearer x'})
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_query_stats_headers(session, user):
+    app = FastAPI()
+    app.include_router(users.router)
+    app.add_middleware(QueryStatsMiddleware, headers=True)
+    app.dependency_overrides[get_session] = lambda: session
+
+    response = TestClient(app).get(f'/users/{user.id}')
+
+    assert response.headers['X-DB-Queries'] == '1'
+    assert float(response.headers['X-DB-Time']) > 0
+
+
+def test_query_stats_headers_disabled_by_default(client, user):
+    response = client.get(f'/users/{user.id}')
+
+    assert 'X-DB-Queries' not in response.headers
+
+
+def test_query_stats_warns_n_plus_one(caplog):
+    middleware = QueryStatsMiddleware(None, n_plus_one=3)
+    stats = QueryStats(count=4)
+    stats.statements.update({'SELECT todos': 3, 'SELECT users': 1})
+
+    middleware.record('/todos/', stats)
+
+    assert 'Possível N+1 em /todos/: 3 execuções de SELECT todos' in (
+        caplog.text
+    )
+    assert 'SELECT users' not in caplog.text
+
+
+def test_query_stats_failed_statements_do_not_leak():
+    engine = instrument(create_engine('sqlite://'))
+
+    with engine.connect() as conn, track_queries() as stats:
+        for _ in range(3):
+            with pytest.raises(OperationalError):
+                conn.execute(text('SELECT * FROM missing'))
+        conn.execute(text('SELECT 1'))
+
+        assert 'query_start' not in conn.info
+
+    assert stats.count == 4  # noqa: PLR2004
+
+
+def test_module_app_is_created_on_demand():
+    module = importlib.import_module('fastapi_zero.app')
+
+    assert isinstance(module.app, FastAPI)
+    assert module.app is module.app
+
+
+def test_import_app_without_settings():
+    env = {
+        name: value
+        for name, value in os.environ.items()
+        if name not in {'DATABASE_URL', 'SECRET_KEY', 'ALGORITHM'}
+    }
+    result = subprocess.run(
+        [sys.executable, '-c', 'import fastapi_zero.app'],
+        env=env,
+        capture_output=True,
+        check=False,
+    )
+
+    assert result.returncode == 0, result.stderr.decode()
+
+
+def test_create_app_settings_configure_pools_and_caches():
+    settings = get_settings().model_copy(
+        update={
+            'HASH_POOL_SIZE': 1,
+            'PRINCIPAL_CACHE_SIZE': 2,
+            'USER_CACHE_SIZE': 3,
+            'LOGIN_IP_BURST': 0,
+        }
+    )
+
+    with TestClient(create_app(settings)):
+        assert hash_pool.size == 1
+        assert principal_cache.maxsize == 2  # noqa: PLR2004
+        assert users.user_cache.maxsize == 3  # noqa: PLR2004
+        assert 'ip' not in auth.login_throttle.limits
+
+    with TestClient(create_app()):
+        assert users.user_cache.maxsize == get_settings().USER_CACHE_SIZE
+
+
+def test_settings_are_cached():
+    assert get_settings() is get_settings()
+
+
+@pytest.mark.asyncio
+async def test_database_engine_is_lazy():
+    database = Database()
+    assert database._engine is None
+
+    engine = database.connect()
+    assert database.engine is engine
+    assert database.replicas.engine_for() is engine
+
+    await database.dispose()
+    assert database._engine is None
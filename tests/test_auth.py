@@ -1,6 +1,12 @@
 from http import HTTPStatus
 
-from fastapi_zero.security import create_access_token
+import pytest
+from jwt import decode
+from pydantic import ValidationError
+
+from fastapi_zero.security import create_access_token, principal_cache
+from fastapi_zero.settings import Settings
+from fastapi_zero.throttle import MemoryBackend, Throttle, throttled_total
 
 
 def test_get_token(client, user):
@@ -48,3 +54,104 @@ def test_token_invalid_password(client, user):
 
     assert response.status_code == HTTPStatus.UNAUTHORIZED
     assert response.json() == {'detail': 'Email ou senha incorretos.'}
+
+
+def test_token_carries_user_id_and_version(client, user, token, settings):
+    payload = decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
+
+    assert payload['sub'] == user.email
+    assert payload['uid'] == user.id
+    assert payload['ver'] == user.token_version
+
+
+def test_token_with_unknown_user_id(client):
+    access_token = create_access_token({'sub': 'b@b.com', 'uid': 99, 'ver': 0})
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {access_token}'}
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+@pytest.mark.asyncio
+async def test_token_revoked_by_version_bump(client, session, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    assert client.get('/todos/', headers=headers).status_code == HTTPStatus.OK
+
+    user.token_version += 1
+    await session.commit()
+    principal_cache.pop(user.id)
+
+    response = client.get('/todos/', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_principal_from_cache_skips_database(client, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+
+    with count_queries() as statements:
+        response = client.get('/todos/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    # só as consultas das tasks (ETag e página), nenhuma em users
+    assert not [sql for sql, _ in statements if 'FROM users' in sql]
+
+
+def test_token_throttled_per_account(client, user, settings, count_queries):
+    data = {'username': user.email, 'password': 'wrong_pass'}
+    for _ in range(settings.LOGIN_ACCOUNT_BURST):
+        client.post('/auth/token', data=data)
+
+    with count_queries() as statements:
+        response = client.post('/auth/token', data=data)
+
+    assert response.status_code == HTTPStatus.TOO_MANY_REQUESTS
+    assert int(response.headers['Retry-After']) > 0
+    assert statements == []
+    assert throttled_total.value('account') > 0
+
+
+def test_token_throttle_is_per_account(client, user, settings):
+    data = {'username': 'other@test.com', 'password': 'wrong_pass'}
+    for _ in range(settings.LOGIN_ACCOUNT_BURST):
+        client.post('/auth/token', data=data)
+
+    response = client.post(
+        '/auth/token',
+        data={'username': user.email, 'password': user.clean_password},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+@pytest.mark.parametrize(
+    'field', ['LOGIN_IP_PER_MINUTE', 'LOGIN_ACCOUNT_PER_MINUTE']
+)
+def test_login_throttle_rate_must_be_positive(field):
+    with pytest.raises(ValidationError):
+        Settings(**{field: 0})
+
+
+@pytest.mark.asyncio
+async def test_throttle_per_scope():
+    throttle = Throttle(MemoryBackend(10), {'ip': (2, 1), 'account': (0, 1)})
+
+    assert await throttle.check(ip='a', account='x') == 0
+    assert await throttle.check(ip='a', account='x') == 0
+    assert await throttle.check(ip='a', account='x') == 1
+    assert await throttle.check(ip='b', account='x') == 0
+
+
+@pytest.mark.asyncio
+async def test_memory_backend_refills_and_evicts(monkeypatch):
+    now = 100.0
+    monkeypatch.setattr('fastapi_zero.throttle.time.monotonic', lambda: now)
+    backend = MemoryBackend(maxsize=1)
+
+    assert await backend.take('a', capacity=1, rate=0.5) == 0
+    assert await backend.take('a', capacity=1, rate=0.5) == 2  # noqa: PLR2004
+    now += 2
+    assert await backend.take('a', capacity=1, rate=0.5) == 0
+
+    await backend.take('b', capacity=1, rate=0.5)
+    assert len(backend._buckets) == 1
@@ -0,0 +1,52 @@
+from freezegun import freeze_time
+
+from fastapi_zero.cache import TTLCache
+
+
+def test_cache_hit_and_miss():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') == 1
+    assert cache.get('b') is None
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 1
+
+
+def test_cache_evicts_least_recently_used():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_cache_expires_entries():
+    cache = TTLCache(maxsize=2, ttl=60)
+    with freeze_time('2025-05-20 00:00:00') as frozen:
+        cache.set('a', 1)
+        frozen.tick(61)
+
+        assert cache.get('a') is None
+
+    assert cache.stats()['expirations'] == 1
+    assert len(cache) == 0
+
+
+def test_cache_disabled_with_maxsize_zero():
+    cache = TTLCache(maxsize=0, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.get('a') is None
+
+
+def test_cache_pop():
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set('a', 1)
+
+    assert cache.pop('a') == 1
+    assert cache.pop('a') is None
@@ -0,0 +1,132 @@
+import gzip
+from http import HTTPStatus
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.responses import StreamingResponse
+
+from fastapi_zero.compression import (
+    BrotliEncoder,
+    CompressionMiddleware,
+    GzipEncoder,
+    ZstdEncoder,
+    compression_bytes_in,
+    negotiate,
+)
+from tests.conftest import TodoFactory
+
+
+@pytest.mark.parametrize(
+    ('accept', 'expected'),
+    [
+        ('gzip', 'gzip'),
+        ('gzip, br', 'br'),
+        ('gzip;q=1.0, br;q=0.5', 'gzip'),
+        ('*', 'br'),
+        ('br;q=0, *;q=0.1', 'gzip'),
+        ('identity', None),
+        ('', None),
+    ],
+)
+def test_negotiate(accept, expected):
+    assert negotiate(accept, ['br', 'gzip']) == expected
+
+
+def _gunzip(data):
+    return gzip.decompress(data)
+
+
+def _unbrotli(data):
+    return pytest.importorskip('brotli').decompress(data)
+
+
+def _unzstd(data):
+    zstandard = pytest.importorskip('zstandard')
+    return zstandard.ZstdDecompressor().decompressobj().decompress(data)
+
+
+@pytest.mark.parametrize(
+    ('module', 'encoder', 'decompress'),
+    [
+        (None, GzipEncoder, _gunzip),
+        ('brotli', BrotliEncoder, _unbrotli),
+        ('zstandard', ZstdEncoder, _unzstd),
+    ],
+)
+def test_encoder_roundtrip(module, encoder, decompress):
+    if module is not None:
+        pytest.importorskip(module)
+    chunks = [b'{"linha": %d}\n' % i * 50 for i in range(3)]
+    compressor = encoder(3)
+
+    # flush entre pedaços, como no streaming, e finish no último
+    data = b''
+    for chunk in chunks[:-1]:
+        data += compressor.compress(chunk) + compressor.flush()
+    data += compressor.compress(chunks[-1]) + compressor.finish()
+
+    assert len(data) < len(b''.join(chunks))
+    assert decompress(data) == b''.join(chunks)
+
+
+@pytest.mark.asyncio
+async def test_large_list_is_compressed(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(50, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'}
+    before = compression_bytes_in.value('gzip')
+
+    response = client.get('/todos/?limit=50', headers=headers)
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert response.headers['Vary'] == 'Accept-Encoding'
+    assert response.headers['ETag'].endswith('-gzip"')
+    assert len(response.json()['todos']) == 50  # noqa: PLR2004
+    assert compression_bytes_in.value('gzip') > before
+
+    conditional = client.get(
+        '/todos/?limit=50',
+        headers={**headers, 'If-None-Match': response.headers['ETag']},
+    )
+    assert conditional.status_code == HTTPStatus.NOT_MODIFIED
+    assert conditional.headers['ETag'] == response.headers['ETag']
+    assert conditional.headers['Vary'] == 'Accept-Encoding'
+
+
+def test_small_response_is_not_compressed(client):
+    response = client.get('/', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_identity_is_not_compressed(client):
+    response = client.get('/hello', headers={'Accept-Encoding': 'identity'})
+
+    assert 'Content-Encoding' not in response.headers
+
+
+def test_streaming_response_is_flushed_per_chunk():
+    async def chunks():
+        for i in range(3):
+            yield f'{{"linha": {i}}}\n'.encode()
+
+    async def app(scope, receive, send):
+        response = StreamingResponse(
+            chunks(), media_type='application/x-ndjson'
+        )
+        await response(scope, receive, send)
+
+    client = TestClient(CompressionMiddleware(app, minimum_size=10_000))
+    with client.stream(
+        'GET', '/', headers={'Accept-Encoding': 'gzip'}
+    ) as response:
+        raw = list(response.iter_raw())
+
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in response.headers
+    body = b''.join(raw)
+    # cada pedaço termina num sync flush, sem esperar o fim do stream
+    assert body.count(b'\x00\x00\xff\xff') == 3  # noqa: PLR2004
+    assert gzip.decompress(body) == (
+        b'{"linha": 0}\n{"linha": 1}\n{"linha": 2}\n'
+    )
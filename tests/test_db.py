@@ -1,11 +1,20 @@
-from dataclasses import asdict
+from dataclasses import fields
 
 import pytest
 from sqlalchemy import select
-from sqlalchemy.exc import DataError, PendingRollbackError
+from sqlalchemy.exc import (
+    DataError,
+    InvalidRequestError,
+    PendingRollbackError,
+    TimeoutError,
+)
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
 
+from fastapi_zero.database import ReplicaRouter, create_engine
 from fastapi_zero.models import Todo, User
+from fastapi_zero.settings import Settings
+from tests.conftest import TodoFactory
 
 
 @pytest.mark.asyncio
@@ -21,15 +30,38 @@ async def test_create_user(session: AsyncSession, mock_db_time):
             select(User).where(User.username == 'test')
         )
 
-    assert asdict(user_db) == {
+    # os todos só vêm com selectinload; o acesso sem carregar levanta erro
+    columns = {
+        field.name: getattr(user_db, field.name)
+        for field in fields(user_db)
+        if field.name != 'todos'
+    }
+    assert columns == {
         'id': 1,
         'username': 'test',
         'password': 'secret',
         'email': 'test@test.com',
+        'token_version': 0,
         'created_at': time,
         'updated_at': time,
-        'todos': [],
     }
+    with pytest.raises(InvalidRequestError):
+        user_db.todos
+
+
+@pytest.mark.asyncio
+async def test_user_todos_with_selectinload(session, user):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+    session.expunge_all()
+
+    user_db = await session.scalar(
+        select(User)
+        .where(User.id == user.id)
+        .options(selectinload(User.todos))
+    )
+
+    assert len(user_db.todos) == 2  # noqa: PLR2004
 
 
 @pytest.mark.asyncio
@@ -43,3 +75,62 @@ async def test_create_todo_error(session, user):
 
     with pytest.raises(PendingRollbackError):
         await session.scalar(select(Todo))
+
+
+@pytest.mark.asyncio
+async def test_pool_records_checkouts(engine):
+    before = engine.pool.stats()['checkout_seconds']['count']
+
+    async with engine.connect() as conn:
+        await conn.execute(select(1))
+        assert engine.pool.stats()['checked_out'] == 1
+
+    stats = engine.pool.stats()
+    assert stats['checkout_seconds']['count'] == before + 1
+    assert stats['checked_out'] == 0
+    assert stats['overflow'] == 0
+    assert stats['connects'] >= 1
+
+
+@pytest.mark.asyncio
+async def test_pool_counts_timeouts(engine):
+    settings = Settings(
+        DATABASE_POOL_SIZE=1,
+        DATABASE_MAX_OVERFLOW=0,
+        DATABASE_POOL_TIMEOUT=0.05,
+    )
+    small = create_engine(
+        settings, engine.url.render_as_string(hide_password=False)
+    )
+
+    async with small.connect():
+        with pytest.raises(TimeoutError):
+            async with small.connect():
+                pass  # pragma: no cover
+
+    assert small.pool.stats()['timeouts'] == 1
+    await small.dispose()
+
+
+def test_replica_router_round_robin():
+    replicas = ReplicaRouter(
+        'primary', ['r1', 'r2'], pin_seconds=60, pin_size=10
+    )
+
+    assert [replicas.engine_for() for _ in range(3)] == ['r1', 'r2', 'r1']
+
+
+def test_replica_router_pins_recent_writer():
+    replicas = ReplicaRouter('primary', ['r1'], pin_seconds=60, pin_size=10)
+
+    replicas.pin(1)
+
+    assert replicas.engine_for(1) == 'primary'
+    assert replicas.engine_for(2) == 'r1'
+    assert replicas.engine_for() == 'r1'
+
+
+def test_replica_router_without_replicas_uses_primary():
+    replicas = ReplicaRouter('primary', [], pin_seconds=60, pin_size=10)
+
+    assert replicas.engine_for(1) == 'primary'
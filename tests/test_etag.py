@@ -0,0 +1,49 @@
+from datetime import datetime
+
+from fastapi_zero.etag import (
+    if_match_tags,
+    make_etag,
+    none_match,
+    parse_resource_etag,
+    resource_etag,
+)
+
+
+def test_make_etag_is_stable_and_quoted():
+    etag = make_etag(1, 10, None)
+
+    assert etag == make_etag(1, 10, None)
+    assert etag != make_etag(1, 11, None)
+    assert etag.startswith('"')
+    assert etag.endswith('"')
+
+
+def test_resource_etag_roundtrip():
+    updated_at = datetime(2024, 1, 1, 12, 30, 0, 123456)
+
+    assert parse_resource_etag(resource_etag(7, updated_at)) == (
+        7,
+        updated_at,
+    )
+    assert parse_resource_etag('"lixo"') is None
+
+
+def test_resource_etag_ignores_encoding_suffix():
+    updated_at = datetime(2024, 1, 1, 12, 30)
+    etag = resource_etag(7, updated_at)
+
+    assert parse_resource_etag(etag[:-1] + '-gzip"') == (7, updated_at)
+    assert if_match_tags(etag[:-1] + '-br"') == [etag]
+
+
+def test_none_match_uses_weak_comparison():
+    assert none_match('W/"a", "b"', '"a"') == 'W/"a"'
+    assert none_match('*', '"a"') == '"a"'
+    assert none_match('"a-zstd"', '"a"') == '"a-zstd"'
+    assert none_match('"b"', '"a"') is None
+    assert none_match(None, '"a"') is None
+
+
+def test_if_match_ignores_weak_tags():
+    assert if_match_tags('W/"a", "b"') == ['"b"']
+    assert if_match_tags(None) is None
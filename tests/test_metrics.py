@@ -0,0 +1,56 @@
+from fastapi_zero.metrics import Histogram, Registry
+
+
+def test_histogram_cumulative_buckets():
+    histogram = Histogram(buckets=(0.1, 1.0))
+
+    histogram.observe(0.05)
+    histogram.observe(0.5)
+    histogram.observe(5)
+
+    assert histogram.snapshot() == {
+        'buckets': {'0.1': 1, '1.0': 2, '+Inf': 3},
+        'sum': 5.55,
+        'count': 3,
+    }
+
+
+def test_histogram_bound_is_inclusive():
+    histogram = Histogram(buckets=(1.0,))
+
+    histogram.observe(1.0)
+
+    assert histogram.cumulative() == [('1.0', 1), ('+Inf', 1)]
+
+
+def test_registry_renders_prometheus_text():
+    registry = Registry()
+    requests = registry.counter('requests_total', 'Requisições.', ('route',))
+    latency = registry.histogram(
+        'latency_seconds', 'Latência.', ('route',), buckets=(0.5,)
+    )
+
+    requests.inc('/a"b')
+    latency.labels('/a').observe(0.25)
+
+    assert registry.render() == (
+        '# HELP requests_total Requisições.\n'
+        '# TYPE requests_total counter\n'
+        'requests_total{route="/a\\"b"} 1\n'
+        '# HELP latency_seconds Latência.\n'
+        '# TYPE latency_seconds histogram\n'
+        'latency_seconds_bucket{route="/a",le="0.5"} 1\n'
+        'latency_seconds_bucket{route="/a",le="+Inf"} 1\n'
+        'latency_seconds_sum{route="/a"} 0.25\n'
+        'latency_seconds_count{route="/a"} 1\n'
+    )
+
+
+def test_gauge_inc_dec():
+    gauge = Registry().gauge('in_flight', 'Em andamento.', ('method',))
+
+    gauge.inc('GET')
+    gauge.inc('GET')
+    gauge.dec('GET')
+
+    assert gauge.value('GET') == 1
@@ -0,0 +1,24 @@
+import pytest
+
+from fastapi_zero.pagination import decode_cursor, encode_cursor, next_page
+
+
+def test_cursor_roundtrip():
+    assert decode_cursor(encode_cursor(42)) == 42  # noqa: PLR2004
+
+
+@pytest.mark.parametrize('cursor', ['invalido', 'eyJpZCI6ICJhIn0', ''])
+def test_decode_invalid_cursor(cursor):
+    with pytest.raises(ValueError, match='Cursor inválido.'):
+        decode_cursor(cursor)
+
+
+def test_next_page_without_more_items():
+    assert next_page([1, 2], limit=2, key=lambda item: item) == ([1, 2], None)
+
+
+def test_next_page_with_more_items():
+    items, cursor = next_page([1, 2, 3], limit=2, key=lambda item: item)
+
+    assert items == [1, 2]
+    assert decode_cursor(cursor) == 2  # noqa: PLR2004
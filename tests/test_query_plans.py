@@ -0,0 +1,128 @@
+from http import HTTPStatus
+
+import pytest
+import pytest_asyncio
+from sqlalchemy import text
+
+from tests.conftest import TodoFactory, UserFactory
+
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE')
+
+
+def _full_scans(node):
+    # seq scan, ou varredura do índice inteiro descartando linhas no filtro
+    full_index_scan = 'Filter' in node and 'Index Cond' not in node
+    if node['Node Type'] == 'Seq Scan' or (
+        node['Node Type'] in {'Index Scan', 'Index Only Scan'}
+        and full_index_scan
+    ):
+        yield node
+    for child in node.get('Plans', []):
+        yield from _full_scans(child)
+
+
+async def _assert_no_seq_scan(engine, statements):
+    explained = 0
+    async with engine.connect() as conn:
+        # sem seq scan habilitado, o planner só o usa se não houver índice
+        await conn.execute(text('SET enable_seqscan = off'))
+        for statement, parameters in statements:
+            if not statement.lstrip().upper().startswith(EXPLAINABLE):
+                continue
+            result = await conn.exec_driver_sql(
+                f'EXPLAIN (FORMAT JSON) {statement}', parameters
+            )
+            plan = result.scalar()
+            assert not list(_full_scans(plan[0]['Plan'])), statement
+            explained += 1
+        await conn.rollback()
+    assert explained
+
+
+@pytest_asyncio.fixture
+async def seeded(session, user, other_user):
+    for owner in (user, other_user):
+        session.add_all(TodoFactory.create_batch(50, user_id=owner.id))
+    session.add_all(UserFactory.create_batch(20))
+    await session.commit()
+    await session.execute(text('ANALYZE'))
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('seeded')
+@pytest.mark.parametrize(
+    'url',
+    [
+        '/todos/',
+        '/todos/?title=abc',
+        '/todos/?description=abc',
+        '/todos/?state=draft',
+        '/todos/?cursor=eyJpZCI6MTB9&limit=5',
+        '/users/',
+        '/users/?cursor=eyJpZCI6MTB9&limit=5',
+        '/users/1',
+    ],
+)
+async def test_read_queries_use_indexes(
+    engine, client, token, count_queries, url
+):
+    with count_queries() as statements:
+        response = client.get(
+            url, headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    await _assert_no_seq_scan(engine, statements)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('seeded')
+async def test_write_queries_use_indexes(
+    engine, client, user, token, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    with count_queries() as statements:
+        client.patch('/todos/1', headers=headers, json={'title': 'novo'})
+        client.delete('/todos/2', headers=headers)
+        client.post(
+            '/auth/token',
+            data={'username': user.email, 'password': user.clean_password},
+        )
+        client.post(
+            '/users/',
+            json={'username': 'x', 'email': 'x@x.com', 'password': 'x'},
+        )
+
+    await _assert_no_seq_scan(engine, statements)
+
+
+def _node_types(node):
+    yield node['Node Type']
+    for child in node.get('Plans', []):
+        yield from _node_types(child)
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('seeded')
+@pytest.mark.parametrize('url', ['/todos/', '/todos/?state=draft'])
+async def test_list_todos_etag_is_index_only(
+    engine, client, token, count_queries, url
+):
+    with count_queries() as statements:
+        client.get(url, headers={'Authorization': f'Bearer {token}'})
+
+    statement, parameters = next(
+        (statement, parameters)
+        for statement, parameters in statements
+        if 'count(*)' in statement
+    )
+    async with engine.connect() as conn:
+        await conn.execute(text('SET enable_seqscan = off'))
+        await conn.execute(text('SET enable_bitmapscan = off'))
+        result = await conn.exec_driver_sql(
+            f'EXPLAIN (FORMAT JSON) {statement}', parameters
+        )
+        plan = result.scalar()
+        await conn.rollback()
+
+    assert 'Index Only Scan' in set(_node_types(plan[0]['Plan']))
@@ -1,8 +1,19 @@
+import asyncio
+import threading
 from http import HTTPStatus
 
+import pytest
+from fastapi import HTTPException
+from freezegun import freeze_time
 from jwt import decode
 
-from fastapi_zero.security import create_access_token
+from fastapi_zero.security import (
+    HashPool,
+    create_access_token,
+    get_password_hash,
+    get_password_hash_async,
+    verify_password_async,
+)
 
 
 def test_jwt(settings):
@@ -25,3 +36,54 @@ def test_jwt_invalid_token(client):
     assert response.json() == {
         'detail': 'Não foi possível validar as credenciais.'
     }
+
+
+def test_jwt_expired_token(client, user):
+    with freeze_time('2025-01-01 12:00:00'):
+        token = create_access_token({
+            'sub': user.email,
+            'uid': user.id,
+            'ver': user.token_version,
+        })
+
+    with freeze_time('2025-01-02 12:00:00'):
+        response = client.get(
+            '/users/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+    assert response.json() == {
+        'detail': 'Não foi possível validar as credenciais.'
+    }
+
+
+@pytest.mark.asyncio
+async def test_password_hash_async():
+    hashed = await get_password_hash_async('secret')
+
+    assert await verify_password_async('secret', hashed)
+    assert not await verify_password_async('wrong', hashed)
+
+
+@pytest.mark.asyncio
+async def test_hash_pool_full_queue():
+    pool = HashPool('thread', size=1, queue_depth=0)
+    release = threading.Event()
+    busy = asyncio.ensure_future(pool.run(release.wait))
+    await asyncio.sleep(0)
+
+    with pytest.raises(HTTPException) as exc:
+        await pool.run(get_password_hash, 'secret')
+
+    release.set()
+    await busy
+    pool.shutdown()
+    assert exc.value.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert pool.pending == 0
+
+
+@pytest.mark.asyncio
+async def test_hash_pool_inline():
+    pool = HashPool('thread', size=0, queue_depth=0)
+
+    assert await pool.run(sum, [1, 2]) == 3  # noqa: PLR2004
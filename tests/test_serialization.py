@@ -0,0 +1,33 @@
+import json
+from datetime import datetime
+
+from fastapi_zero.models import Todo, TodoState
+from fastapi_zero.schemas import TodoPublic
+from fastapi_zero.serialization import (
+    json_response,
+    public_columns,
+    rows_to_dicts,
+)
+
+
+def test_public_columns_follow_schema_fields():
+    columns = public_columns(Todo, TodoPublic)
+
+    assert [column.key for column in columns] == list(TodoPublic.model_fields)
+
+
+def test_json_response_serializes_dates_and_enums():
+    response = json_response({
+        'state': TodoState.done,
+        'created_at': datetime(2024, 1, 1),
+    })
+
+    assert response.media_type == 'application/json'
+    assert json.loads(response.body) == {
+        'state': 'done',
+        'created_at': '2024-01-01T00:00:00',
+    }
+
+
+def test_rows_to_dicts_empty():
+    assert rows_to_dicts([]) == []
@@ -1,8 +1,17 @@
+import csv
+import io
+import json
 from http import HTTPStatus
 
 import pytest
-
-from fastapi_zero.models import Todo, TodoState
+from sqlalchemy import delete, select
+
+from fastapi_zero.counters import (
+    reconcile_todo_counters,
+    reconcile_user_counters,
+)
+from fastapi_zero.database import db
+from fastapi_zero.models import Todo, TodoCounter, TodoState
 from tests.conftest import TodoFactory
 
 
@@ -187,13 +196,14 @@ async def test_patch_todo(token, client, mock_db_time, make_frozen_todo):
             json={'title': 'updated title'},
         )
         assert response.status_code == HTTPStatus.OK
-        assert response.json() == {
+        body = response.json()
+        assert body.pop('updated_at') > time.isoformat()
+        assert body == {
             'title': 'updated title',
             'description': my_todo.description,
             'id': my_todo.id,
             'state': my_todo.state,
             'created_at': time.isoformat(),
-            'updated_at': time.isoformat(),
         }
 
 
@@ -203,3 +213,601 @@ async def test_list_todos_filter_min_length(client, token):
         '/todos/?title=s', headers={'Authorization': f'Bearer {token}'}
     )
     assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_list_todos_auth_does_not_load_todos(
+    session, client, user, token, count_queries
+):
+    session.add_all(TodoFactory.create_batch(20, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        response = client.get(
+            '/todos/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    # usuário autenticado, ETag da listagem e a página de tasks
+    assert len(statements) == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_list_todos_cursor_pagination(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(5, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/?limit=2', headers=headers).json()
+    second = client.get(
+        f'/todos/?limit=2&cursor={first["next_cursor"]}', headers=headers
+    ).json()
+    third = client.get(
+        f'/todos/?limit=2&cursor={second["next_cursor"]}', headers=headers
+    ).json()
+
+    ids = [
+        todo['id'] for page in (first, second, third) for todo in page['todos']
+    ]
+    assert ids == [1, 2, 3, 4, 5]
+    assert third['next_cursor'] is None
+
+
+@pytest.mark.parametrize(
+    'cursor',
+    [
+        'invalido',
+        'eyJpZCI6IHRydWV9',  # {"id": true}
+    ],
+)
+def test_list_todos_invalid_cursor(client, token, cursor):
+    response = client.get(
+        f'/todos/?cursor={cursor}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+
+
+@pytest.mark.asyncio
+async def test_list_todos_filter_title_is_case_insensitive(
+    session, client, user, token
+):
+    session.add(TodoFactory(title='Comprar PÃO', user_id=user.id))
+    session.add(TodoFactory(title='Lavar roupa', user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/?title=comprar', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        'Comprar PÃO'
+    ]
+
+
+@pytest.mark.asyncio
+async def test_list_todos_filter_escapes_wildcards(
+    session, client, user, token
+):
+    session.add(TodoFactory(title='100% feito', user_id=user.id))
+    session.add(TodoFactory(title='1000 feitos', user_id=user.id))
+    await session.commit()
+
+    response = client.get(
+        '/todos/?title=100%25', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert [todo['title'] for todo in response.json()['todos']] == [
+        '100% feito'
+    ]
+
+
+def test_create_todo_single_statement(client, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+
+    with count_queries() as statements:
+        response = client.post(
+            '/todos/',
+            json={'title': 'a', 'description': 'b', 'state': 'draft'},
+            headers=headers,
+        )
+
+    assert response.status_code == HTTPStatus.CREATED
+    assert len(statements) == 1
+    assert 'RETURNING' in statements[0][0]
+
+
+@pytest.mark.asyncio
+async def test_patch_todo_single_statement(
+    client, token, make_todo, count_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+
+    with count_queries() as statements:
+        response = client.patch(
+            f'/todos/{make_todo.id}', json={'state': 'done'}, headers=headers
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.json()['state'] == 'done'
+    assert len(statements) == 1
+    assert statements[0][0].startswith('UPDATE')
+
+
+@pytest.mark.asyncio
+async def test_delete_todo_is_committed(session, client, token, make_todo):
+    client.delete(
+        f'/todos/{make_todo.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    await session.rollback()
+    assert (
+        await session.scalar(select(Todo).where(Todo.id == make_todo.id))
+        is None
+    )
+
+
+def test_create_todos_batch(client, token):
+    response = client.post(
+        '/todos/batch',
+        json=[
+            {'title': 'a', 'description': 'a'},
+            {'title': 'b', 'description': 'b', 'state': 'done'},
+        ],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.CREATED
+    results = response.json()['results']
+    assert [r['status'] for r in results] == [HTTPStatus.CREATED] * 2
+    assert [r['todo']['title'] for r in results] == ['a', 'b']
+    assert results[1]['todo']['state'] == 'done'
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch(
+    session, client, user, token, other_user_todo
+):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id, state='todo'))
+    await session.commit()
+
+    response = client.patch(
+        '/todos/batch',
+        json=[
+            {'id': 2, 'state': 'done'},
+            {'id': 3, 'title': 'novo'},
+            {'id': other_user_todo.id, 'title': 'invasão'},
+        ],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    results = response.json()['results']
+    assert [r['status'] for r in results] == [200, 200, 404]
+    assert results[0]['todo']['state'] == 'done'
+    assert results[1]['todo']['title'] == 'novo'
+    assert results[1]['todo']['state'] == 'todo'
+
+
+@pytest.mark.asyncio
+async def test_patch_todos_batch_single_statement(
+    session, client, user, token, count_queries
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/todos/', headers=headers)
+
+    with count_queries() as statements:
+        client.patch(
+            '/todos/batch',
+            json=[{'id': todo_id, 'state': 'done'} for todo_id in (1, 2, 3)],
+            headers=headers,
+        )
+
+    assert len(statements) == 1
+
+
+def test_patch_todos_batch_repeated_ids(client, token):
+    response = client.patch(
+        '/todos/batch',
+        json=[{'id': 1, 'title': 'a'}, {'id': 1, 'title': 'b'}],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY
+    assert response.json() == {'detail': 'IDs repetidos no lote.'}
+
+
+@pytest.mark.asyncio
+async def test_delete_todos_batch(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id))
+    await session.commit()
+
+    response = client.request(
+        'DELETE',
+        '/todos/batch',
+        json=[1, 2, 99],
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert [r['status'] for r in response.json()['results']] == [200, 200, 404]
+    assert await session.scalar(select(Todo)) is None
+
+
+def test_todos_batch_size_limit(client, token, settings):
+    response = client.post(
+        '/todos/batch',
+        json=[{'title': 'a', 'description': 'a'}]
+        * (settings.TODO_BATCH_MAX_SIZE + 1),
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+@pytest.mark.asyncio
+async def test_export_todos_ndjson(
+    session, client, user, token, other_user_todo
+):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id, state='done'))
+    session.add_all(TodoFactory.create_batch(2, user_id=user.id, state='todo'))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?state=done',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'] == 'application/x-ndjson'
+    todos = [json.loads(line) for line in response.text.splitlines()]
+    assert [todo['state'] for todo in todos] == ['done'] * 3
+    assert set(todos[0]) == {
+        'id',
+        'title',
+        'description',
+        'state',
+        'created_at',
+        'updated_at',
+    }
+
+
+@pytest.mark.asyncio
+async def test_export_todos_csv(session, client, user, token):
+    session.add(TodoFactory(user_id=user.id, title='a, "b"', state='draft'))
+    await session.commit()
+
+    response = client.get(
+        '/todos/export?format=csv',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['content-type'].startswith('text/csv')
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert len(rows) == 1
+    assert rows[0]['title'] == 'a, "b"'
+    assert rows[0]['state'] == 'draft'
+
+
+@pytest.mark.asyncio
+async def test_import_todos_ndjson(session, client, user, token):
+    lines = [
+        json.dumps({'title': f'todo {i}', 'description': 'd', 'state': 'done'})
+        for i in range(3)
+    ]
+    lines.insert(1, json.dumps({'title': 'sem descrição'}))
+    lines.insert(2, '{quebrado')
+
+    response = client.post(
+        '/todos/import',
+        content='\n'.join(lines).encode(),
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    events = [json.loads(line) for line in response.text.splitlines()]
+    assert events[0] == {'event': 'progress', 'processed': 5, 'rejected': 2}
+    done = events[-1]
+    assert done['event'] == 'done'
+    assert done['imported'] == 3  # noqa: PLR2004
+    assert [error['line'] for error in done['errors']] == [2, 3]
+    assert 'description' in done['errors'][0]['detail']
+
+    todos = (await session.scalars(select(Todo))).all()
+    assert {todo.title for todo in todos} == {'todo 0', 'todo 1', 'todo 2'}
+    assert {todo.user_id for todo in todos} == {user.id}
+
+
+@pytest.mark.asyncio
+async def test_import_todos_csv(session, client, token):
+    body = (
+        'title,description,state\n"a, b",desc,draft\nc,d,invalido\ne,f,todo\n'
+    )
+
+    response = client.post(
+        '/todos/import',
+        content=body.encode(),
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'text/csv',
+        },
+    )
+
+    done = json.loads(response.text.splitlines()[-1])
+    assert done['imported'] == 2  # noqa: PLR2004
+    assert done['rejected'] == 1
+    assert done['errors'][0]['line'] == 3  # noqa: PLR2004
+    titles = (await session.scalars(select(Todo.title))).all()
+    assert sorted(titles) == ['a, b', 'e']
+
+
+def test_import_todos_unsupported_media_type(client, token):
+    response = client.post(
+        '/todos/import',
+        content=b'[]',
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/json',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.UNSUPPORTED_MEDIA_TYPE
+
+
+@pytest.mark.parametrize('chunked', [False, True])
+def test_import_todos_too_large(client, token, settings, chunked):
+    client.app.state.settings = settings.model_copy(
+        update={'TODO_IMPORT_MAX_BYTES': 10}
+    )
+    body = b'{"title": "a", "description": "b"}\n'
+
+    response = client.post(
+        '/todos/import',
+        content=iter([body[:5], body[5:]]) if chunked else body,
+        headers={
+            'Authorization': f'Bearer {token}',
+            'Content-Type': 'application/x-ndjson',
+        },
+    )
+
+    assert response.status_code == HTTPStatus.REQUEST_ENTITY_TOO_LARGE
+
+
+def test_write_pins_user_to_primary(client, token, user):
+    client.post(
+        '/todos/',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'title': 'Test todo', 'description': 'desc', 'state': 'draft'},
+    )
+
+    assert db.replicas.pins.get(user.id)
+
+
+def test_todo_endpoints_max_queries(
+    client, token, user, session, assert_max_queries
+):
+    headers = {'Authorization': f'Bearer {token}'}
+    with assert_max_queries(2):
+        todo_id = client.post(
+            '/todos/',
+            headers=headers,
+            json={'title': 'Test todo', 'description': 'd', 'state': 'draft'},
+        ).json()['id']
+
+    with assert_max_queries(2):
+        client.get('/todos/', headers=headers)
+
+    with assert_max_queries(1):
+        client.patch(
+            f'/todos/{todo_id}', headers=headers, json={'title': 'novo'}
+        )
+
+    with assert_max_queries(1):
+        client.delete(f'/todos/{todo_id}', headers=headers)
+
+
+def test_list_todos_if_none_match(client, token, make_todo):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert response.headers['ETag'] == etag
+    assert not response.content
+
+
+def test_list_todos_etag_changes_on_write(client, token, make_todo):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.get('/todos/', headers=headers).headers['ETag']
+
+    client.patch(
+        f'/todos/{make_todo.id}', headers=headers, json={'title': 'novo'}
+    )
+    response = client.get(
+        '/todos/', headers={**headers, 'If-None-Match': etag}
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
+def test_list_todos_etag_depends_on_filter(client, token, make_todo):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/todos/?limit=1', headers=headers).headers['ETag']
+    second = client.get('/todos/?limit=2', headers=headers).headers['ETag']
+
+    assert first != second
+
+
+def test_patch_todo_if_match(client, token, make_todo):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.patch(
+        f'/todos/{make_todo.id}', headers=headers, json={}
+    ).headers['ETag']
+
+    response = client.patch(
+        f'/todos/{make_todo.id}',
+        headers={**headers, 'If-Match': etag},
+        json={'title': 'novo'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
+def test_patch_todo_if_match_stale(client, token, make_todo):
+    headers = {'Authorization': f'Bearer {token}'}
+    etag = client.patch(
+        f'/todos/{make_todo.id}', headers=headers, json={}
+    ).headers['ETag']
+    client.patch(
+        f'/todos/{make_todo.id}', headers=headers, json={'title': 'outro'}
+    )
+
+    response = client.patch(
+        f'/todos/{make_todo.id}',
+        headers={**headers, 'If-Match': etag},
+        json={'title': 'novo'},
+    )
+
+    assert response.status_code == HTTPStatus.PRECONDITION_FAILED
+    assert response.json() == {
+        'detail': 'A task foi alterada por outra requisição.'
+    }
+
+
+def test_patch_todo_if_match_not_found(client, token):
+    response = client.patch(
+        '/todos/10',
+        headers={'Authorization': f'Bearer {token}', 'If-Match': '"10-x"'},
+        json={'title': 'novo'},
+    )
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_patch_todo_if_match_from_compressed_response(
+    client, token, make_todo
+):
+    headers = {'Authorization': f'Bearer {token}', 'Accept-Encoding': 'gzip'}
+    compressed = client.patch(
+        f'/todos/{make_todo.id}',
+        headers=headers,
+        json={'description': 'x' * 2048},
+    )
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    etag = compressed.headers['ETag']
+    assert etag.startswith('"')
+    assert etag.endswith('-gzip"')
+
+    response = client.patch(
+        f'/todos/{make_todo.id}',
+        headers={**headers, 'If-Match': etag},
+        json={'title': 'novo'},
+    )
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def _stats(client, token):
+    response = client.get(
+        '/todos/stats', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.OK
+    return response.json()
+
+
+def test_todo_stats_empty(client, token):
+    assert _stats(client, token) == {
+        'total': 0,
+        'states': dict.fromkeys([state.value for state in TodoState], 0),
+    }
+
+
+def test_todo_stats_follow_writes(client, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    todo = {'title': 't', 'description': 'd', 'state': 'todo'}
+    created = client.post('/todos/', json=todo, headers=headers).json()
+    client.post('/todos/batch', json=[todo, todo], headers=headers)
+
+    client.patch(
+        f'/todos/{created["id"]}', json={'state': 'done'}, headers=headers
+    )
+    client.delete(f'/todos/{created["id"] + 1}', headers=headers)
+
+    stats = _stats(client, token)
+    assert stats['total'] == 2  # noqa: PLR2004
+    assert stats['states']['todo'] == 1
+    assert stats['states']['done'] == 1
+
+
+@pytest.mark.asyncio
+async def test_todo_stats_single_query(
+    session, client, user, token, count_queries
+):
+    session.add_all(TodoFactory.create_batch(20, user_id=user.id))
+    await session.commit()
+
+    with count_queries() as statements:
+        stats = _stats(client, token)
+
+    assert stats['total'] == 20  # noqa: PLR2004
+    assert not any('FROM todos' in statement for statement, _ in statements)
+
+
+@pytest.mark.asyncio
+async def test_todo_counters_removed_with_user(session, client, user, token):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    assert await session.scalar(select(TodoCounter)) is None
+
+
+@pytest.mark.asyncio
+async def test_reconcile_todo_counters(session, user, other_user):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    counter = await session.scalar(
+        select(TodoCounter).where(TodoCounter.user_id == user.id)
+    )
+    counter.count = 100
+    session.add_all([
+        TodoCounter(user_id=other_user.id, state=TodoState.done, count=1),
+        # usuário que não existe mais
+        TodoCounter(user_id=999, state=TodoState.todo, count=4),
+    ])
+    await session.commit()
+
+    assert await reconcile_todo_counters(session, batch_size=1) == 3  # noqa: PLR2004
+    assert await reconcile_todo_counters(session) == 0
+
+    counters = await session.scalars(select(TodoCounter.count))
+    assert sum(counters) == 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+async def test_reconcile_user_counters_recreates_missing(session, user):
+    session.add_all(TodoFactory.create_batch(3, user_id=user.id))
+    await session.commit()
+    await session.execute(delete(TodoCounter))
+    await session.commit()
+
+    assert await reconcile_user_counters(session, user.id) > 0
+    assert await reconcile_user_counters(session, 999) == 0
+
+    counters = await session.scalars(select(TodoCounter.count))
+    assert sum(counters) == 3  # noqa: PLR2004
@@ -1,6 +1,9 @@
 from http import HTTPStatus
 
+from fastapi_zero.database import get_session
+from fastapi_zero.routers import users
 from fastapi_zero.schemas import UserPublic
+from fastapi_zero.security import principal_cache
 
 
 def test_create_user(client):
@@ -52,7 +55,7 @@ def test_read_users(client, user, token):
         '/users/', headers={'Authorization': f'Bearer {token}'}
     )
     assert response.status_code == HTTPStatus.OK
-    assert response.json() == {'users': [user_schema]}
+    assert response.json() == {'users': [user_schema], 'next_cursor': None}
 
 
 def test_read_user(client, user):
@@ -145,3 +148,177 @@ def test_update_user_with_wrong_user(client, other_user, token):
     )
     assert response.status_code == HTTPStatus.FORBIDDEN
     assert response.json() == {'detail': 'Sem permissão.'}
+
+
+def test_read_users_auth_single_query(client, user, token, count_queries):
+    with count_queries() as statements:
+        response = client.get(
+            '/users/', headers={'Authorization': f'Bearer {token}'}
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 2  # noqa: PLR2004
+
+
+def test_delete_user_with_todos(client, user, token, make_todo):
+    response = client.delete(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+    )
+    assert response.status_code == HTTPStatus.OK
+    assert response.json() == {'message': 'Usuário deletado.'}
+
+
+def test_read_users_principal_cache_hit(client, user, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/users/', headers=headers)
+
+    with count_queries() as statements:
+        response = client.get('/users/', headers=headers)
+
+    assert response.status_code == HTTPStatus.OK
+    # o usuário autenticado vem do cache, só a listagem vai ao banco
+    assert len(statements) == 1
+    assert principal_cache.stats()['hits'] >= 1
+
+
+def test_update_user_invalidates_principal_cache(client, user, token):
+    client.get('/users/', headers={'Authorization': f'Bearer {token}'})
+    assert user.id in principal_cache._data
+
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'updated', 'email': 'new@a.com', 'password': '1'},
+    )
+
+    assert user.id not in principal_cache._data
+    response = client.get(
+        '/users/', headers={'Authorization': f'Bearer {token}'}
+    )
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_delete_user_invalidates_principal_cache(client, user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/users/', headers=headers)
+
+    client.delete(f'/users/{user.id}', headers=headers)
+
+    response = client.get('/users/', headers=headers)
+    assert response.status_code == HTTPStatus.UNAUTHORIZED
+
+
+def test_internal_stats(client, internal_headers):
+    response = client.get('/internal/stats', headers=internal_headers)
+
+    assert response.status_code == HTTPStatus.OK
+    assert set(response.json()['principal_cache']) == {
+        'size',
+        'maxsize',
+        'hits',
+        'misses',
+        'evictions',
+        'expirations',
+    }
+    assert response.json()['pool']['checkout_seconds']['count'] >= 0
+
+
+def test_read_users_cursor_pagination(client, user, other_user, token):
+    headers = {'Authorization': f'Bearer {token}'}
+
+    first = client.get('/users/?limit=1', headers=headers).json()
+    second = client.get(
+        f'/users/?limit=1&cursor={first["next_cursor"]}', headers=headers
+    ).json()
+
+    assert [u['id'] for u in first['users']] == [user.id]
+    assert [u['id'] for u in second['users']] == [other_user.id]
+    assert second['next_cursor'] is None
+
+
+def test_update_user_single_statement(client, user, token, count_queries):
+    headers = {'Authorization': f'Bearer {token}'}
+    client.get('/users/', headers=headers)
+
+    with count_queries() as statements:
+        response = client.put(
+            f'/users/{user.id}',
+            headers=headers,
+            json={'username': 'novo', 'email': 'novo@a.com', 'password': '1'},
+        )
+
+    assert response.status_code == HTTPStatus.OK
+    assert len(statements) == 1
+    assert 'RETURNING' in statements[0][0]
+
+
+def test_read_user_if_none_match(client, user):
+    etag = client.get(f'/users/{user.id}').headers['ETag']
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.NOT_MODIFIED
+    assert not response.content
+
+
+def test_read_user_etag_changes_on_update(client, user, token):
+    etag = client.get(f'/users/{user.id}').headers['ETag']
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'bob', 'email': 'bob@e.com', 'password': 'x'},
+    )
+
+    response = client.get(f'/users/{user.id}', headers={'If-None-Match': etag})
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['ETag'] != etag
+
+
+def test_read_user_cache_hit_skips_database(client, user, count_queries):
+    client.get(f'/users/{user.id}')
+
+    with count_queries() as statements:
+        response = client.get(f'/users/{user.id}')
+
+    assert response.status_code == HTTPStatus.OK
+    assert response.headers['Cache-Control'] == 'public, max-age=30'
+    assert response.json()['username'] == user.username
+    assert statements == []
+
+
+def test_update_user_invalidates_cache(client, user, token):
+    client.get(f'/users/{user.id}')
+    client.put(
+        f'/users/{user.id}',
+        headers={'Authorization': f'Bearer {token}'},
+        json={'username': 'bob', 'email': 'bob@e.com', 'password': 'x'},
+    )
+
+    response = client.get(f'/users/{user.id}')
+
+    assert response.json()['username'] == 'bob'
+
+
+def test_delete_user_invalidates_cache(client, user, token):
+    client.get(f'/users/{user.id}')
+    client.delete(
+        f'/users/{user.id}', headers={'Authorization': f'Bearer {token}'}
+    )
+
+    response = client.get(f'/users/{user.id}')
+
+    assert response.status_code == HTTPStatus.NOT_FOUND
+
+
+def test_read_user_cache_miss_reads_primary():
+    # uma réplica atrasada não pode repor no cache o perfil antigo
+    route = next(
+        route
+        for route in users.router.routes
+        if route.path == '/users/{user_id}' and 'GET' in route.methods
+    )
+
+    dependencies = {dep.call for dep in route.dependant.dependencies}
+    assert get_session in dependencies
@@ -0,0 +1,64 @@
+from http import HTTPStatus
+from types import SimpleNamespace
+
+import pytest
+
+from fastapi_zero.app import create_app
+from fastapi_zero.settings import get_settings
+from fastapi_zero.warmup import run_warmup, warm_database, warmup_seconds
+
+
+def test_health_live(client):
+    response = client.get('/health/live')
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_health_ready_without_warmup(client):
+    response = client.get('/health/ready')
+
+    assert response.status_code == HTTPStatus.OK
+
+
+def test_health_ready_while_warming(client):
+    client.app.state.ready = False
+
+    response = client.get('/health/ready')
+
+    assert response.status_code == HTTPStatus.SERVICE_UNAVAILABLE
+    assert response.headers['Retry-After'] == '1'
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('session')
+async def test_warm_database_fills_pool(engine):
+    settings = get_settings().model_copy(update={'WARMUP_CONNECTIONS': 3})
+
+    await warm_database(engine, settings)
+
+    assert engine.pool.checkedin() >= 3  # noqa: PLR2004
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures('session')
+async def test_run_warmup_marks_ready(engine):
+    app = create_app()
+    app.state.ready = False
+    settings = get_settings().model_copy(update={'WARMUP_CONNECTIONS': 1})
+
+    await run_warmup(app, engine, settings)
+
+    assert app.state.ready
+    assert warmup_seconds.value('database') > 0
+    assert warmup_seconds.value('security') > 0
+
+
+@pytest.mark.asyncio
+async def test_run_warmup_failure_still_marks_ready(caplog):
+    app = SimpleNamespace(state=SimpleNamespace(ready=False))
+    settings = get_settings().model_copy(update={'WARMUP_CONNECTIONS': 1})
+
+    await run_warmup(app, None, settings)
+
+    assert app.state.ready
+    assert 'Falha no aquecimento' in caplog.text